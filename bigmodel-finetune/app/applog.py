@@ -0,0 +1,127 @@
+import os
+import queue
+import _thread
+import random
+import threading
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import has_request_context, request
+
+from .metrics import LOG_RECORDS_DROPPED
+
+# 应用内所有模块的logger均在app包下
+APP_LOGGER = "app"
+
+
+class RouteSampler(logging.Filter):
+    """
+    按路由采样INFO及以下级别的日志，WARNING及以上始终保留
+    """
+
+    def __init__(self, rates):
+        """
+        :param rates: {路由规则: 采样率}，如{"/v1/foundation-model/finetune/<string:job_id>": 0.1}
+        """
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates or not has_request_context():
+            return True
+        rate = self.rates.get(request.url_rule.rule if request.url_rule is not None else None)
+        return rate is None or random.random() < rate
+
+
+def _native_queue():
+    # listener运行在原生线程中，队列不能使用被gevent patch的锁
+    try:
+        from gevent import monkey
+        return monkey.get_original("queue", "SimpleQueue")()
+    except ImportError:
+        return queue.SimpleQueue()
+
+
+def _native_start_new_thread():
+    # gevent下threading.Thread是hub上的greenlet，写文件仍会阻塞请求，需要原生线程
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched("threading"):
+            return monkey.get_original("_thread", "start_new_thread")
+    except ImportError:
+        pass
+    return _thread.start_new_thread
+
+
+def _native_rlock():
+    # 目标handler同时被hub上的greenlet和listener线程使用，gevent的锁不能跨原生线程等待
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched("threading"):
+            return monkey.get_original("_thread", "RLock")()
+    except ImportError:
+        pass
+    return threading.RLock()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    队列满时丢弃日志，不阻塞请求；丢弃数通过finetune_log_records_dropped_total暴露
+    """
+
+    def __init__(self, log_queue, maxsize):
+        super().__init__(log_queue)
+        self.maxsize = maxsize
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.maxsize:
+            LOG_RECORDS_DROPPED.inc()
+            return
+        self.queue.put_nowait(record)
+
+
+class NativeQueueListener(QueueListener):
+    """
+    在原生线程中消费日志队列，文件写入不占用gevent hub
+    """
+
+    def start(self):
+        self._thread = _native_start_new_thread()(self._monitor, ())
+
+    def stop(self):
+        # 原生线程无法join，放入结束标记后由线程自行退出
+        self.enqueue_sentinel()
+        self._thread = None
+
+
+def setup_logging(app, basic_config, target_handlers):
+    """
+    请求中只把日志放入队列，由后台listener写入gunicorn的日志文件
+    :param app: Flask应用
+    :param basic_config: asset.yml配置
+    :param target_handlers: 实际写日志的handler，一般为gunicorn.error的handlers
+    :return: NativeQueueListener
+    """
+    handler = DroppingQueueHandler(_native_queue(), int(basic_config.get("LOG_QUEUE_SIZE", 10000)))
+    handler.addFilter(RouteSampler(basic_config.get("LOG_SAMPLE_RATES", {})))
+
+    logger = logging.getLogger(APP_LOGGER)
+    logger.handlers = [handler]
+    logger.setLevel(basic_config.get("LOG_LEVEL", logging.INFO))
+    logger.propagate = False
+    # Flask的app.logger(app.run)交由app包的logger处理
+    app.logger.handlers = []
+    app.logger.setLevel(logging.NOTSET)
+
+    for target in target_handlers:
+        target.lock = _native_rlock()
+    listener = NativeQueueListener(handler.queue, *target_handlers, respect_handler_level=True)
+    listener.start()
+
+    def restart_listener():
+        # fork后子进程中没有listener线程，使用新的队列重新启动
+        handler.queue = listener.queue = _native_queue()
+        listener.start()
+
+    os.register_at_fork(after_in_child=restart_listener)
+    return listener
@@ -0,0 +1,184 @@
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+
+class FMUnavailableError(Exception):
+    """fm后端不可用，调用被拒绝或超时"""
+
+
+class CircuitOpenError(FMUnavailableError):
+    """熔断器打开，快速失败"""
+
+
+class BulkheadFullError(FMUnavailableError):
+    """线程池及等待队列已满"""
+
+
+class FMTimeoutError(FMUnavailableError):
+    """调用超时"""
+
+
+class CircuitBreaker:
+    """
+    连续失败达到阈值后打开，reset_timeout后进入半开状态放行一次试探调用
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def release(self):
+        """放弃本次放行的调用（未真正执行），半开状态下归还试探名额"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def _native_lock():
+    # 计数器会在原生线程中更新，需要未被gevent patch的锁
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched("threading"):
+            return monkey.get_original("_thread", "allocate_lock")()
+    except ImportError:
+        pass
+    return threading.Lock()
+
+
+def _new_executor(max_workers):
+    # gevent下使用原生线程池，阻塞的fm调用不会占住gevent hub
+    try:
+        from gevent import monkey
+        from gevent.threadpool import ThreadPoolExecutor
+        if monkey.is_module_patched("threading"):
+            return ThreadPoolExecutor(max_workers=max_workers)
+    except ImportError:
+        pass
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+class Bulkhead:
+    """
+    fm接口专用的有界线程池：限制并发与排队数，按操作设置超时，并由熔断器在后端持续失败时快速失败
+    """
+
+    def __init__(self, max_workers=16, max_queue=32, timeouts=None, default_timeout=20, breaker=None):
+        """
+        :param max_workers: 线程数
+        :param max_queue: 允许排队的调用数，超出后直接拒绝
+        :param timeouts: {操作名: 超时秒数}，为None时不限时
+        :param default_timeout: 未配置操作的超时秒数
+        :param breaker: CircuitBreaker
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._busy_lock = _native_lock()
+        self._executor = None
+        self._pid = None
+
+    @property
+    def executor(self):
+        # 线程池不能跨fork使用，按进程懒加载
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = _new_executor(self.max_workers)
+                    self._pid = os.getpid()
+                    self._busy_lock = _native_lock()
+                    self._busy = 0
+        return self._executor
+
+    def call(self, operation, func, **kwargs):
+        """
+        :return: func的返回值
+        :raise: FMUnavailableError或者func抛出的异常
+        """
+        executor = self.executor
+        # 先占用线程池名额再询问熔断器，避免半开状态的试探调用因池满被拒后名额无法归还
+        with self._busy_lock:
+            if self._busy >= self.max_workers + self.max_queue:
+                raise BulkheadFullError(f"fm pool full: {operation}")
+            self._busy += 1
+        if not self.breaker.allow():
+            self._release()
+            raise CircuitOpenError(f"fm circuit open: {operation}")
+
+        def run():
+            try:
+                return func(**kwargs)
+            finally:
+                self._release()
+
+        try:
+            future = executor.submit(contextvars.copy_context().run, run)
+        except Exception:
+            self._release()
+            self.breaker.release()
+            raise
+        try:
+            res = future.result(timeout=self.timeouts.get(operation, self.default_timeout))
+        except FutureTimeoutError:
+            # 超时的调用仍会占用线程直至返回
+            self.breaker.record_failure()
+            raise FMTimeoutError(f"fm {operation} timed out")
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return res
+
+    def _release(self):
+        with self._busy_lock:
+            self._busy -= 1
+
+    def stats(self):
+        with self._busy_lock:
+            busy = self._busy
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "busy": busy,
+            "saturation": busy / float(self.max_workers),
+            "circuit": self.breaker.state
+        }
@@ -0,0 +1,124 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class _InflightCall:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    带过期时间的LRU缓存，同一key并发未命中时只执行一次加载(single-flight)
+    """
+
+    def __init__(self, maxsize=1024, ttl=5):
+        """
+        :param maxsize: 最大缓存条数，超出后淘汰最久未使用的条目
+        :param ttl: 默认过期时间(秒)，None表示不过期
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (value, expire_at)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _expire_at(self, ttl):
+        return None if ttl is None else time.monotonic() + ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expire_at = entry
+                if expire_at is None or expire_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+            # 过期条目保留到被覆盖或淘汰，供peek降级使用
+            self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=-1):
+        """
+        :param ttl: 过期时间(秒)，-1表示使用默认值，None表示不过期
+        """
+        expire_at = self._expire_at(self.ttl if ttl == -1 else ttl)
+        with self._lock:
+            self._data[key] = (value, expire_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def peek(self, key, default=None):
+        """
+        忽略过期时间读取条目，不影响命中统计，用于后端不可用时降级
+        """
+        with self._lock:
+            entry = self._data.get(key)
+        return default if entry is None else entry[0]
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key, loader, ttl_func=None):
+        """
+        命中则直接返回，否则调用loader加载；并发未命中共享同一次loader调用
+        :param loader: 无参加载函数，返回None时不缓存
+        :param ttl_func: 根据加载结果返回过期时间的函数，缺省使用默认ttl
+        :return: 缓存值或者loader的返回值
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expire_at = entry
+                if expire_at is None or expire_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+            # 过期条目保留到被覆盖或淘汰，供peek降级使用
+            self.misses += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _InflightCall()
+                self._inflight[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            value = loader()
+            call.value = value
+            if value is not None:
+                self.set(key, value, ttl_func(value) if ttl_func else -1)
+            return value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,64 @@
+import zlib
+
+from flask import request
+
+# Content-Encoding -> zlib的wbits，deflate为zlib格式
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def init_app(app, basic_config, endpoints):
+    """
+    按客户端的Accept-Encoding对指定接口的大响应进行gzip/deflate压缩，流式响应逐块压缩
+    :param app: Flask应用
+    :param basic_config: asset.yml配置
+    :param endpoints: 需要压缩的视图函数名
+    """
+    endpoints = frozenset(endpoints)
+    min_size = int(basic_config.get("COMPRESS_MIN_SIZE", 1024))
+    level = int(basic_config.get("COMPRESS_LEVEL", 6))
+
+    @app.after_request
+    def _compress_response(response):
+        if request.endpoint not in endpoints or response.status_code != 200 or \
+                "Content-Encoding" in response.headers:
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(list(_WBITS))
+        if encoding is None:
+            return response
+        if response.is_streamed:
+            if response.content_length is not None and response.content_length < min_size:
+                return response
+            response.response = _compress_stream(response.response, encoding, level)
+            # 压缩后长度未知，werkzeug 2.2给content_length赋值None会写入"None"
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(_compress(data, encoding, level))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+def _compressor(encoding, level):
+    return zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+
+
+def _compress(data, encoding, level):
+    compressor = _compressor(encoding, level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_stream(chunks, encoding, level):
+    compressor = _compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
@@ -1,16 +1,95 @@
 import os
 import time
 import json
-import requests
+import uuid
+import logging
 import fm.fm_sdk as fm
 
+from .bulkhead import Bulkhead, CircuitBreaker, FMUnavailableError
+from .cache import TTLCache
+from .metricseries import MetricSeries
+from .metrics import FM_POOL_BUSY, FM_CIRCUIT_OPEN, observe, track
+from .httpclient import HTTPClient
+from .logindex import LineIndex, split_lines
+from .logkeyindex import JOB_ID_PATTERN, DEFAULT_PREFIX_TEMPLATE, LogKeyIndex
+from .iamtoken import IAMTokenCache
 from .obshandler import OBSHandler
-from .util import read_full_yaml, convert_mstimestamp, gen_uuid, convert_dict_to_yaml
+from .pool import run_concurrently
+from .snapshot import FinetuneSnapshot
+from .watcher import PhaseWatcher
+from .util import read_full_yaml, convert_mstimestamp, gen_uuid, convert_dict_to_yaml, parse_utc_isotime, hash_dict, \
+    presigned_url_expire_at
+
+logger = logging.getLogger(__name__)
 
 # 获取当前文件所在的目录的路径
 CUR_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-BASIC_CONFIG = read_full_yaml(path=os.path.join(CUR_PATH, "conf", "asset.yml"))
-FINETUNE_CONFIG = read_full_yaml(path=os.path.join(CUR_PATH, "conf", "finetune_basic.yml"))
+# 配置文件目录，可通过FINETUNE_CONF_DIR指定
+CONF_PATH = os.environ.get("FINETUNE_CONF_DIR", os.path.join(CUR_PATH, "conf"))
+FINETUNE_CONFIG_PATH = os.path.join(CONF_PATH, "finetune_basic.yml")
+BASIC_CONFIG = read_full_yaml(path=os.path.join(CONF_PATH, "asset.yml"))
+# finetune_basic.yml不含密钥，读取后保留，供重新加载配置使用
+FINETUNE_CONFIG = read_full_yaml(path=FINETUNE_CONFIG_PATH, remove=False)
+# 当前生效的配置快照，重新加载时整体替换引用
+_SNAPSHOT = FinetuneSnapshot(FINETUNE_CONFIG)
+# 终态的微调任务信息不会再变化
+TERMINAL_PHASES = frozenset(["Completed", "Failed", "Stopped"])
+# 批量查询中job不存在时的错误信息
+JOB_NOT_FOUND = "job_id不存在"
+# IAM token默认有效期为24小时，响应中缺少expires_at时使用
+IAM_TOKEN_DEFAULT_TTL = 24 * 3600
+
+
+# 不设超时的fm操作：registry在gunicorn master加载配置时执行，慢只会推迟启动，超时则master无法启动
+FM_UNBOUNDED_TIMEOUTS = {"registry": None}
+
+# 当前进程是否已注册fm组件
+_REGISTERED = False
+
+
+def registry_once():
+    """
+    在gunicorn master中注册一次fm组件，fork出的worker直接继承；重新加载配置时不重复注册
+    :return: bool
+    """
+    global _REGISTERED
+    if not _REGISTERED:
+        _REGISTERED = FoundationModelHandler().registry() is not False
+    return _REGISTERED
+
+
+def get_snapshot():
+    return _SNAPSHOT
+
+
+def load_snapshot(path=FINETUNE_CONFIG_PATH):
+    """
+    读取finetune_basic.yml生成配置快照
+    :param path: 配置文件路径
+    :return: FinetuneSnapshot|None, 文件不存在或解析失败时为None
+    """
+    if not os.path.exists(path):
+        logger.warning("finetune config not found: %s", path)
+        return None
+    try:
+        return FinetuneSnapshot(read_full_yaml(path=path, remove=False))
+    except Exception:
+        logger.exception("load finetune config failed")
+        return None
+
+
+def reload_snapshot(path=FINETUNE_CONFIG_PATH):
+    """
+    重新读取finetune_basic.yml并原子替换配置快照，文件不存在或解析失败时保留旧快照
+    :param path: 配置文件路径
+    :return: bool, 是否替换成功
+    """
+    global _SNAPSHOT
+    snapshot = load_snapshot(path)
+    if snapshot is None:
+        return False
+    _SNAPSHOT = snapshot
+    return True
 
 
 class FoundationModelHandler:
@@ -20,8 +99,7 @@ class FoundationModelHandler:
             config_path (url_string): 注册组件相关配置文件
         """
         basic_config = BASIC_CONFIG
-        finetune_config = FINETUNE_CONFIG
-        self.finetune_config = finetune_config
+        finetune_config = get_snapshot()
         self.__registry_type = str(basic_config["REGISTRY_TYPE"])
         self.__aicc_ak = basic_config["AK"]
         self.__aicc_sk = basic_config["SK"]
@@ -33,23 +111,104 @@ class FoundationModelHandler:
         self.__iam_endpoint = basic_config["IAM_ENDPOINT"]
         self.__endpoint = basic_config["ENDPOINT"]
         self.__finetune_log_endpoint = basic_config["FINETUNE_LOG_ENDPOINT"]
-
-        # 设置默认scenario、foundation_model、app_config用于获取session
-        self.scenario_default = finetune_config["scenario"]
-        foundation_model_default = finetune_config["foundation_model"]["supported"][0]
-        self.app_config_default = os.path.join(finetune_config["foundation_model"][
-            foundation_model_default]["model_save_path"], finetune_config["foundation_model"][
-            foundation_model_default]["inference"]["app_config_name"])
+        # 批量查询时fm接口的最大并发数
+        self.fm_pool_size = int(basic_config.get("FM_POOL_SIZE", 8))
+        # 所有fm调用都经过的隔离线程池与熔断器
+        self.fm_bulkhead = Bulkhead(max_workers=int(basic_config.get("FM_BULKHEAD_WORKERS", 16)),
+                                    max_queue=int(basic_config.get("FM_BULKHEAD_QUEUE", 32)),
+                                    timeouts=dict(FM_UNBOUNDED_TIMEOUTS, **basic_config.get("FM_TIMEOUTS", {})),
+                                    default_timeout=float(basic_config.get("FM_DEFAULT_TIMEOUT", 20)),
+                                    breaker=CircuitBreaker(
+                                        failure_threshold=int(basic_config.get("FM_BREAKER_THRESHOLD", 5)),
+                                        reset_timeout=float(basic_config.get("FM_BREAKER_RESET", 30))))
+        # 微调状态缓存，运行中的任务按ttl过期，终态任务保留至被LRU淘汰
+        self.status_cache = TTLCache(maxsize=int(basic_config.get("STATUS_CACHE_SIZE", 1024)),
+                                     ttl=float(basic_config.get("STATUS_CACHE_TTL", 5)))
+        # 长轮询/SSE共用的phase变化监听
+        self.phase_watcher = PhaseWatcher(self.get_finetune_info,
+                                          interval=float(basic_config.get("PHASE_WATCH_INTERVAL", 3)))
+        # 已上传的model_config路径
+        self.uploaded_configs = TTLCache(maxsize=int(basic_config.get("MODEL_CONFIG_CACHE_SIZE", 4096)), ttl=None)
+        # 日志对象的行索引，按对象路径缓存
+        self.log_indexes = TTLCache(maxsize=int(basic_config.get("LOG_INDEX_CACHE_SIZE", 256)), ttl=None)
+        self.log_read_max_bytes = int(basic_config.get("LOG_READ_MAX_BYTES", 1024 * 1024))
+        # 单次日志搜索最多扫描的字节数，超出后返回next_line由客户端继续查找
+        self.log_search_max_bytes = int(basic_config.get("LOG_SEARCH_MAX_BYTES", 16 * 1024 * 1024))
+        # 日志中提取的训练指标，按对象路径缓存
+        self.metric_series = TTLCache(maxsize=int(basic_config.get("METRIC_SERIES_CACHE_SIZE", 256)), ttl=None)
+        # 预签名日志url缓存，按url中的过期时间失效，无法解析时使用LOG_URL_CACHE_TTL
+        self.log_urls = TTLCache(maxsize=int(basic_config.get("LOG_URL_CACHE_SIZE", 1024)),
+                                 ttl=float(basic_config.get("LOG_URL_CACHE_TTL", 300)))
+        # 距url过期不足该秒数时不再返回缓存，留给客户端下载的时间
+        self.log_url_expire_margin = float(basic_config.get("LOG_URL_EXPIRE_MARGIN", 60))
+        # IAM、ModelArts日志接口共用的HTTP连接池
+        self.http = HTTPClient.from_config(basic_config)
+        # IAM token缓存，仅保存在内存中
+        self.iam_token = IAMTokenCache(self._login,
+                                       refresh_margin=float(basic_config.get("IAM_TOKEN_REFRESH_MARGIN", 300)))
 
         # 初始化OBSClient
-        self.obs_client = OBSHandler(basic_config, finetune_config["finetune_bucket"])
+        self.obs_client = OBSHandler(basic_config, finetune_config.bucket)
+        # job_id到日志对象key的索引
+        self.log_key_index = LogKeyIndex(self.obs_client,
+                                         index_file=basic_config.get("LOG_KEY_INDEX_FILE"),
+                                         prefix_template=basic_config.get("LOG_KEY_PREFIX_TEMPLATE",
+                                                                          DEFAULT_PREFIX_TEMPLATE),
+                                         rescan_interval=float(basic_config.get("LOG_KEY_RESCAN_INTERVAL", 60)))
+        # 任务创建、删除的监听者，listener(event, job)
+        self._job_listeners = []
+
+    @property
+    def snapshot(self):
+        return get_snapshot()
+
+    @property
+    def scenario_default(self):
+        return get_snapshot().scenario
+
+    @property
+    def app_config_default(self):
+        return get_snapshot().app_config_default
+
+    def add_job_listener(self, listener):
+        """注册任务事件监听者
+        Args:
+            listener (callable): listener(event, job)，event为created或deleted，job为dict
+        """
+        self._job_listeners.append(listener)
+
+    def _notify_job(self, event, job):
+        # 监听者异常不影响任务本身的创建、删除
+        for listener in self._job_listeners:
+            try:
+                listener(event, job)
+            except Exception:
+                logger.exception("job listener failed: %s %s", event, job.get("job_id"))
 
     def get_config(self):
         """获取微调基本配置文件
         Returns:
             dict: 配置信息，比如预置的大模型app_config、model_config等信息
         """
-        return self.finetune_config
+        return get_snapshot().config
+
+    def _fm(self, operation, **kwargs):
+        """调用fm接口，统计耗时与失败次数
+        Args:
+            operation (string): fm接口名，比如show
+        Returns:
+            fm接口的返回值
+        """
+        try:
+            with track("fm", operation) as call:
+                res = self.fm_bulkhead.call(operation, getattr(fm, operation), **kwargs)
+                if res is False or res == -1:
+                    call.failed()
+                return res
+        finally:
+            stats = self.fm_bulkhead.stats()
+            FM_POOL_BUSY.set(stats["busy"])
+            FM_CIRCUIT_OPEN.set(0 if stats["circuit"] == CircuitBreaker.CLOSED else 1)
 
     def registry(self):
         """注册fm组件
@@ -59,7 +218,7 @@ class FoundationModelHandler:
         # registry info需要“ ”拼接成一个字符串
         registry_info = " ".join(
             [self.__registry_type, self.__aicc_ak, self.__aicc_sk, self.__obs_endpoint, self.__encryption_option])
-        return fm.registry(registry_info=registry_info)
+        return self._fm("registry", registry_info=registry_info)
 
     def create_finetune_by_user(self, user, task_name, foundation_model, task_type, model_config=None, **parameters):
         """通过用户创建微调任务
@@ -72,61 +231,245 @@ class FoundationModelHandler:
         Returns:
             string: -1 或者 job_id(7200a67f-f042-xxxx-xxxx-e7cedcd10dbd)
         """
-        params = {}
-        supported_params = self.finetune_config["foundation_model"][foundation_model][task_type]["supported_params"]
-        for key, value in parameters.items():
-            if key in supported_params:
-                params[key] = value
-        model_save_path = self.finetune_config["foundation_model"][foundation_model]["model_save_path"]
-        app_config_name = self.finetune_config["foundation_model"][foundation_model][task_type]["app_config_name"]
-        model_config_name = self.finetune_config["foundation_model"][
-            foundation_model][task_type]["model_config_name"]
-        app_config = os.path.join(model_save_path, app_config_name)
+        app_config, model_config = self.prepare_finetune_config(
+            user, foundation_model, task_type, model_config, **parameters)
+        logger.info("create finetune: %s %s %s", task_name, app_config, model_config)
+        res = self.create_finetune(task_name, app_config, model_config)
+        if res != -1:
+            self._notify_job("created", {"user": user, "job_id": res, "task_name": task_name,
+                                         "foundation_model": foundation_model})
+        return res
+
+    def prepare_finetune_config(self, user, foundation_model, task_type, model_config=None, **parameters):
+        """过滤参数并生成微调使用的app_config、model_config
+        Args:
+            user (string): 用户
+            foundation_model (string): 大模型名称
+            task_type (string): 任务类型
+            model_config (string, optional): model_config 对应路径. Defaults to None.
+        Returns:
+            tuple: (app_config, model_config)
+        """
+        snapshot = get_snapshot()
+        task = snapshot.task(foundation_model, task_type)
+        if task is None:
+            raise ValueError(f"不支持的大模型或任务类型: {foundation_model}, {task_type}")
+        params = {key: value for key, value in parameters.items() if key in task.supported_params}
         if params != {}:
-            model_yaml = convert_dict_to_yaml({"params": params})
-            # 微调的参数并不是创建的时候拉取的，需要一个微调保存一份
-            target_path = os.path.join(
-                model_save_path, task_type, user, str(int(time.time())), model_config_name)
-            path = target_path.replace(
-                "obs://" + self.finetune_config["finetune_bucket"] + "/", "")
-            print("model path: ", path)
-            self.obs_client.put_content(
-                target_path=path, content=model_yaml)
-            model_config = target_path
+            model_config = self.upload_model_config(snapshot, task, params)
         if model_config is None:
-            model_config = os.path.join(model_save_path, model_config_name)
+            model_config = task.default_model_config
+        return task.app_config, model_config
+
+    def validate_finetune_spec(self, foundation_model, task_type, parameters):
+        """校验微调任务的大模型、任务类型与参数
+        Args:
+            foundation_model (string): 大模型名称
+            task_type (string): 任务类型
+            parameters (dict): 微调参数
+        Returns:
+            string|None: 错误信息，校验通过为None
+        """
+        snapshot = get_snapshot()
+        if foundation_model not in snapshot.supported:
+            return f"不支持的大模型: {foundation_model}"
+        task = snapshot.task(foundation_model, task_type)
+        if task is None:
+            return f"不支持的任务类型: {task_type}"
+        unsupported = [key for key in parameters if key not in task.supported_params]
+        if unsupported:
+            return f"不支持的参数: {', '.join(unsupported)}"
+        return None
+
+    def create_finetune_batch(self, specs):
+        """批量创建微调任务，先全部校验，再以有界线程池并发提交
+        Args:
+            specs (list): [{"user", "task_name", "foundation_model", "task_type", "parameters": dict}]
+        Returns:
+            list: 与specs顺序一致的{"task_name", "job_id"}或者{"error"}；存在校验失败时不提交任何任务
+        """
+        errors = [self.validate_finetune_spec(spec["foundation_model"], spec["task_type"], spec["parameters"])
+                  for spec in specs]
+        if any(errors):
+            return [{"error": error} if error else {"error": "批量中存在校验失败的任务，未提交"}
+                    for error in errors]
+
+        # 预先生成不重复的名称，避免名字冲突时再次调用fm.finetune
+        names = set()
+        for spec in specs:
+            name = "-".join([spec["task_name"], gen_uuid(6)])
+            while name in names:
+                name = "-".join([spec["task_name"], uuid.uuid4().hex[:6]])
+            names.add(name)
+            spec["job_name"] = name
 
-        print(task_name, app_config, model_config)
-        return self.create_finetune(task_name, app_config, model_config)
+        def submit(spec):
+            app_config, model_config = self.prepare_finetune_config(
+                spec["user"], spec["foundation_model"], spec["task_type"], **spec["parameters"])
+            res = self.create_finetune(spec["job_name"], app_config, model_config, retry=False)
+            if res == -1:
+                raise RuntimeError("创建微调任务失败")
+            self._notify_job("created", {"user": spec["user"], "job_id": res, "task_name": spec["job_name"],
+                                         "foundation_model": spec["foundation_model"]})
+            return res
 
-    def create_finetune(self, task_name, app_config, model_config):
+        results = []
+        for spec, (job_id, error) in zip(specs, run_concurrently(submit, specs, max_workers=self.fm_pool_size)):
+            if error is not None:
+                results.append({"task_name": spec["job_name"], "error": str(error)})
+            else:
+                results.append({"task_name": spec["job_name"], "job_id": job_id})
+        return results
+
+    def upload_model_config(self, snapshot, task, params):
+        """按参数内容的hash保存model_config，相同参数只上传一次
+        Args:
+            snapshot (FinetuneSnapshot): 配置快照
+            task (TaskSpec): 大模型与任务类型的配置
+            params (dict): 微调参数
+        Returns:
+            string: model_config的obs url
+        """
+        # 微调的参数并不是创建的时候拉取的，以参数内容寻址，相同参数的微调共用一份
+        target_path = os.path.join(
+            task.model_save_path, task.task_type, "params", hash_dict(params), task.model_config_name)
+        if self.uploaded_configs.get(target_path):
+            return target_path
+        path = snapshot.obs_key(target_path)
+        if self.obs_client.get_object_meta(path) is None:
+            logger.info("model path: %s", path)
+            if not self.obs_client.put_content(
+                    target_path=path, content=convert_dict_to_yaml({"params": params})):
+                return target_path
+        self.uploaded_configs.set(target_path, True)
+        return target_path
+
+    def create_finetune(self, task_name, app_config, model_config, retry=True):
         """创建微调任务（fm接口）
         Args:
             task_name (string): 微调名称，自定义
             app_config (string): obs url
             model_config (string): obs url
+            retry (bool): 失败时是否加随机后缀重试一次
         Returns:
             string: -1 或者 job_id(7200a67f-f042-xxxx-xxxx-e7cedcd10dbd)
         """
-        res = fm.finetune(scenario=self.finetune_config["scenario"], app_config=app_config,
+        res = self._fm("finetune", scenario=self.scenario_default, app_config=app_config,
                           job_name=task_name, model_config_path=model_config)
         # 一般为-1表示名字重复，或者资源不够，前者可能性大。若要精准捕获异常，联系微调团队改源码
-        if res == -1:
+        if res == -1 and retry:
             task_name = "-".join([task_name, gen_uuid(6)])
-            res = fm.finetune(scenario=self.finetune_config["scenario"], app_config=app_config,
+            res = self._fm("finetune", scenario=self.scenario_default, app_config=app_config,
                               job_name=task_name, model_config_path=model_config)
 
         # 失败为-1; 成功为job_id，比如c2170961-f3a8-xxxx-xxx-1845943479c3
         return res
 
     def delete_finetune(self, job_id):
-        """根据job_id删除微调任务, 注意删除时需要删除相关资源（todo）
+        """根据job_id删除微调任务，并删除其在finetune_bucket中的日志
         Args:
             job_id (string): 样例：2695527d-d0be-xxxx-xxxx-a006ea13d7e4
         Returns:
             bool: None|False
         """
-        return fm.delete(scenario=self.scenario_default, app_config=self.app_config_default, job_id=job_id)
+        res, log_keys = self._delete_job(job_id)
+        if res is not False:
+            self.purge_log_keys(log_keys)
+        return res
+
+    def _delete_job(self, job_id):
+        # 删除后无法再查询日志目录，先列出日志key
+        log_keys = self.get_finetune_log_keys(job_id)
+        res = self._fm("delete", scenario=self.scenario_default, app_config=self.app_config_default, job_id=job_id)
+        self.status_cache.invalidate(job_id)
+        if res is not False:
+            self._notify_job("deleted", {"job_id": job_id})
+        return res, log_keys
+
+    def get_finetune_log_keys(self, job_id):
+        """列出job_id的所有日志对象，多个worker时每个worker一个日志
+        Args:
+            job_id (string): 
+        Returns:
+            list: 日志对象key
+        """
+        keys = []
+        indexed = self.log_key_index.get(job_id)
+        if indexed is not None:
+            keys.append(indexed)
+        try:
+            item = self._fm("show", scenario=self.scenario_default,
+                            app_config=self.app_config_default, job_id=job_id)
+            if item == "":
+                return keys
+            for key in self.log_key_index.job_keys(self._log_dir(item), job_id):
+                if key not in keys:
+                    keys.append(key)
+        except Exception:
+            logger.exception("list log keys failed: %s", job_id)
+        return keys
+
+    def _log_dir(self, item):
+        # fm返回的日志目录为/<bucket>/<dir>
+        log_path_dir = item["spec"]["log_export_path"]["obs_url"]
+        return log_path_dir.replace("/" + get_snapshot().bucket + "/", "")
+
+    def purge_log_keys(self, log_keys):
+        """批量删除日志对象，并清理对应的索引
+        Args:
+            log_keys (list): 日志对象key
+        Returns:
+            list: 删除失败的key
+        """
+        if not log_keys:
+            return []
+        failed = self.obs_client.delete_objects(log_keys)
+        for key in log_keys:
+            self.log_indexes.invalidate(key)
+            for job_id in JOB_ID_PATTERN.findall(os.path.basename(key)):
+                self.log_key_index.discard(job_id)
+        logger.info("purge log keys: %d deleted, %d failed", len(log_keys) - len(failed), len(failed))
+        return failed
+
+    def delete_finetune_batch(self, job_ids):
+        """并发删除多个微调任务，日志对象汇总后批量删除
+        Args:
+            job_ids (list): job_id列表
+        Returns:
+            tuple: (deleted, errors)，deleted为删除成功的job_id列表，errors为{job_id: 错误信息}
+        """
+        job_ids = list(dict.fromkeys(job_ids))
+        results = run_concurrently(self._delete_job, job_ids, max_workers=self.fm_pool_size)
+        deleted, errors, log_keys = [], {}, []
+        for job_id, (res, error) in zip(job_ids, results):
+            if error is not None:
+                errors[job_id] = str(error)
+            elif res[0] is False:
+                errors[job_id] = "删除微调任务失败"
+            else:
+                deleted.append(job_id)
+                log_keys.extend(res[1])
+        self.purge_log_keys(log_keys)
+        return deleted, errors
+
+    def terminal_finetune_batch(self, job_ids):
+        """并发终止多个微调任务
+        Args:
+            job_ids (list): job_id列表
+        Returns:
+            tuple: (stopped, errors)，stopped为终止成功的job_id列表，errors为{job_id: 错误信息}
+        """
+        job_ids = list(dict.fromkeys(job_ids))
+        results = run_concurrently(self.terminal_finetune, job_ids, max_workers=self.fm_pool_size)
+        stopped, errors = [], {}
+        for job_id, (res, error) in zip(job_ids, results):
+            if error is not None:
+                errors[job_id] = str(error)
+            elif res is False:
+                errors[job_id] = "终止微调任务失败"
+            else:
+                stopped.append(job_id)
+        return stopped, errors
 
     def terminal_finetune(self, job_id):
         """根据job_id终止微调任务
@@ -135,7 +478,9 @@ class FoundationModelHandler:
         Returns:
             bool: None|False
         """
-        return fm.stop(scenario=self.scenario_default, app_config=self.app_config_default, job_id=job_id)
+        res = self._fm("stop", scenario=self.scenario_default, app_config=self.app_config_default, job_id=job_id)
+        self.status_cache.invalidate(job_id)
+        return res
 
     def get_parm_value(self, parms, key):
         for parm in parms:
@@ -144,13 +489,30 @@ class FoundationModelHandler:
         return None
 
     def get_finetune_info(self, job_id):
-        """获取微调信息
+        """获取微调信息，优先读取状态缓存
         Args:
             job_id (string): 
         Returns:
             dict|None: 
         """
-        item = fm.show(scenario=self.scenario_default,
+        try:
+            return self.status_cache.get_or_load(
+                job_id, lambda: self._load_finetune_info(job_id), ttl_func=self._status_ttl)
+        except FMUnavailableError:
+            # fm不可用时返回过期的缓存
+            info = self.status_cache.peek(job_id)
+            if info is None:
+                raise
+            return dict(info, stale=True)
+
+    def _status_ttl(self, info):
+        # 终态不过期
+        if info["phase"] in TERMINAL_PHASES:
+            return None
+        return self.status_cache.ttl
+
+    def _load_finetune_info(self, job_id):
+        item = self._fm("show", scenario=self.scenario_default,
                        app_config=self.app_config_default, job_id=job_id)
         if item != "":
             created_at = convert_mstimestamp(item["metadata"]["create_time"])
@@ -160,7 +522,7 @@ class FoundationModelHandler:
             phase = item["status"]["phase"]
             task_type = self.get_parm_value(parms, "task_type")
             runtime = item["status"]["duration"]
-            engine_name = self.finetune_config["foundation_model"]["engine"]
+            engine_name = get_snapshot().engine
 
             return {
                 "task_name": task_name,
@@ -174,6 +536,41 @@ class FoundationModelHandler:
         # job_id不存在
         return None
 
+    def get_finetune_info_batch(self, job_ids):
+        """并发获取多个微调信息
+        Args:
+            job_ids (list): job_id列表
+        Returns:
+            tuple: (data, errors)，data为{job_id: dict}，errors为{job_id: 错误信息}
+        """
+        job_ids = list(dict.fromkeys(job_ids))
+        results = run_concurrently(self.get_finetune_info, job_ids, max_workers=self.fm_pool_size)
+        data, errors = {}, {}
+        for job_id, (info, error) in zip(job_ids, results):
+            if error is not None:
+                errors[job_id] = str(error)
+            elif info is None:
+                errors[job_id] = JOB_NOT_FOUND
+            else:
+                data[job_id] = info
+        return data, errors
+
+    def get_finetune_log_path(self, job_id):
+        """根据job_id获取日志在finetune_bucket中的对象路径
+        Args:
+            job_id (string): 
+        Returns:
+            string|None: 
+        """
+        log_path = self.log_key_index.get(job_id)
+        if log_path is not None:
+            return log_path
+        item = self._fm("show", scenario=self.scenario_default,
+                       app_config=self.app_config_default, job_id=job_id)
+        if item == "":
+            return None
+        return self.log_key_index.lookup(self._log_dir(item), job_id)
+
     def get_finetune_log(self, job_id):
         """根据job_id获取日志
         Args:
@@ -181,14 +578,7 @@ class FoundationModelHandler:
         Returns:
             dict: 
         """
-        item = fm.show(scenario=self.scenario_default,
-                       app_config=self.app_config_default, job_id=job_id)
-        log_path_dir = item["spec"]["log_export_path"]["obs_url"]
-        log_path_dir = log_path_dir.replace(
-            "/" + self.finetune_config["finetune_bucket"] + "/", "")
-        path_list = self.obs_client.get_obj_by_delimeter(log_path_dir)
-        log_path = self.obs_client.get_log_by_id(
-            path_list=path_list, job_id=job_id)
+        log_path = self.get_finetune_log_path(job_id)
         if not log_path:
             return None
 
@@ -197,9 +587,169 @@ class FoundationModelHandler:
             "content": self.obs_client.read_file(log_path)
         }
 
+    def _log_object(self, job_id, log_path=None, meta=None):
+        """调用方未传入时根据job_id查找日志对象路径及其元数据
+        Returns:
+            tuple: (log_path, meta)，日志不存在时meta为None
+        """
+        if log_path is None:
+            log_path = self.get_finetune_log_path(job_id)
+        if meta is None and log_path:
+            meta = self.obs_client.get_object_meta(log_path)
+        return log_path, meta
+
+    def tail_finetune_log(self, job_id, cursor=0, log_path=None, meta=None):
+        """从字节偏移cursor开始读取新追加的日志
+        Args:
+            job_id (string): 
+            cursor (int): 上次返回的next_cursor
+            log_path (string, optional): 已查到的日志对象路径
+            meta (dict, optional): 已查到的日志对象元数据
+        Returns:
+            dict|None: content为完整行内容，next_cursor为下次读取的偏移
+        """
+        log_path, meta = self._log_object(job_id, log_path, meta)
+        if meta is None:
+            return None
+        size = meta["size"]
+        cursor = max(0, min(cursor, size))
+        stop = min(size, cursor + self.log_read_max_bytes)
+        data = self.obs_client.read_range(log_path, cursor, stop)
+        # 只返回完整的行，未写完的行留到下次读取
+        end = data.rfind(b"\n") + 1
+        if end == 0 and len(data) >= self.log_read_max_bytes:
+            # 单行超过读取上限时直接返回
+            end = len(data)
+        return {
+            "log_path": log_path,
+            "content": data[:end].decode("utf-8", errors="replace"),
+            "cursor": cursor,
+            "next_cursor": cursor + end,
+            "size": size
+        }
+
+    def _get_log_index(self, log_path, meta):
+        if meta is None:
+            return None
+        index = self.log_indexes.get_or_load(log_path, LineIndex)
+        if index.size != meta["size"]:
+            index.update(self.obs_client, log_path, meta["size"])
+        return index
+
+    def get_finetune_log_lines(self, job_id, from_line=0, limit=100, log_path=None, meta=None):
+        """按行分页读取日志
+        Args:
+            job_id (string): 
+            from_line (int): 起始行号，从0开始
+            limit (int): 行数
+            log_path (string, optional): 已查到的日志对象路径
+            meta (dict, optional): 已查到的日志对象元数据
+        Returns:
+            dict|None: 
+        """
+        log_path, meta = self._log_object(job_id, log_path, meta)
+        index = self._get_log_index(log_path, meta)
+        if index is None:
+            return None
+        # 负数的行号或行数会使返回的next_line倒退，客户端据此翻页时会重复或死循环
+        from_line = max(0, from_line)
+        limit = max(1, limit)
+        start, stop, count = index.line_span(from_line, limit)
+        data = self.obs_client.read_range(log_path, start, stop)
+        lines = split_lines(data)
+        return {
+            "log_path": log_path,
+            "lines": lines,
+            "from_line": from_line,
+            "next_line": from_line + count,
+            "total_lines": index.line_count
+        }
+
+    def search_finetune_log(self, job_id, keyword, from_line=0, limit=100, log_path=None, meta=None):
+        """从from_line开始按块查找包含keyword的行，最多返回limit条，通过next_line继续查找；
+        单次最多扫描log_search_max_bytes字节，扫描完未找满limit条时也返回
+        Args:
+            job_id (string): 
+            keyword (string): 子串
+            from_line (int): 起始行号
+            limit (int): 最大匹配数
+            log_path (string, optional): 已查到的日志对象路径
+            meta (dict, optional): 已查到的日志对象元数据
+        Returns:
+            dict|None: 
+        """
+        log_path, meta = self._log_object(job_id, log_path, meta)
+        index = self._get_log_index(log_path, meta)
+        if index is None:
+            return None
+        total = index.line_count
+        line_no = max(0, from_line)
+        matches = []
+        scanned = 0
+        # 每次读取的行数，保证单次读取的字节数大致在log_read_max_bytes以内
+        batch = 1000
+        while line_no < total and len(matches) < limit and scanned < self.log_search_max_bytes:
+            start, stop, count = index.line_span(line_no, batch)
+            if stop - start > self.log_read_max_bytes and count > 1:
+                batch = max(1, batch // 2)
+                continue
+            data = self.obs_client.read_range(log_path, start, stop)
+            scanned += stop - start
+            for offset, line in enumerate(split_lines(data)):
+                if keyword in line:
+                    matches.append({"line": line_no + offset, "content": line})
+                    if len(matches) >= limit:
+                        count = offset + 1
+                        break
+            line_no += count
+        return {
+            "log_path": log_path,
+            "matches": matches,
+            "next_line": line_no,
+            "total_lines": total
+        }
+
+    def get_finetune_metrics(self, job_id, foundation_model=None, since_step=None, limit=None):
+        """从日志中增量提取训练指标
+        Args:
+            job_id (string): 
+            foundation_model (string, optional): 大模型名称，决定使用的metric_patterns
+            since_step (int, optional): 只返回该step之后的点
+            limit (int, optional): 最多返回的点数
+        Returns:
+            dict|None: 
+        """
+        patterns = get_snapshot().metric_patterns(foundation_model)
+        if patterns is None:
+            raise ValueError(f"未配置训练指标: {foundation_model}")
+        log_path = self.get_finetune_log_path(job_id)
+        meta = self.obs_client.get_object_meta(log_path) if log_path else None
+        if meta is None:
+            return None
+        series = self.metric_series.get_or_load(log_path, lambda: MetricSeries(patterns))
+        if series.patterns is not patterns:
+            # 配置重新加载后按新的正则重新解析
+            series = MetricSeries(patterns)
+            self.metric_series.set(log_path, series)
+        if series.size != meta["size"]:
+            series.update(self.obs_client, log_path, meta["size"], chunk_size=self.log_read_max_bytes)
+        return dict(series.points(since_step=since_step, limit=limit), log_path=log_path)
+
     def get_auth(self):
         '''
-        获取token
+        获取token，优先使用缓存，失败时返回None
+        '''
+        try:
+            return self.iam_token.get()
+        except Exception:
+            logger.exception("get iam token failed")
+        return None
+
+    @observe("iam", "login")
+    def _login(self):
+        '''
+        通过IAM密码认证获取token
+        :return: (token, 过期时间戳)
         '''
         url = self.__iam_endpoint
         # 获取token
@@ -227,26 +777,58 @@ class FoundationModelHandler:
             }
         }
         auth = json.dumps(auth)
-        res = requests.post(url, data=auth, headers={
-                            "Content-Type": "application/json"})
+        res = self.http.post(url, endpoint="IAM", data=auth, headers={
+                             "Content-Type": "application/json"})
         token = res.headers.get('X-Subject-Token')
-        return token
+        if res.status_code >= 300 or not token:
+            raise RuntimeError(f"iam login failed: {res.status_code}")
+        try:
+            expire_at = parse_utc_isotime(res.json()["token"]["expires_at"])
+        except (ValueError, KeyError, TypeError):
+            expire_at = time.time() + IAM_TOKEN_DEFAULT_TTL
+        return token, expire_at
 
-    def get_finetune_log_url(self, job_id):
-        """根据job_id获取日志
+    def get_finetune_log_url(self, job_id, refresh=False):
+        """根据job_id获取日志的预签名url，过期前使用缓存
         Args:
             job_id (string): 
+            refresh (bool): 是否跳过缓存重新获取
         Returns:
             dict: 
         """
+        if refresh:
+            self.log_urls.invalidate(job_id)
+        return self.log_urls.get_or_load(
+            job_id, lambda: self._load_finetune_log_url(job_id), ttl_func=self._log_url_ttl)
+
+    def _log_url_ttl(self, res):
+        expire_at = presigned_url_expire_at(res.get("obs_url") or "")
+        if expire_at is None:
+            return self.log_urls.ttl
+        return max(0, expire_at - time.time() - self.log_url_expire_margin)
+
+    def _load_finetune_log_url(self, job_id):
         url = os.path.join(self.__finetune_log_endpoint,
                            f"training-jobs/{job_id}/tasks/worker-0/logs/url")
+        token = self.get_auth()
+        if token is None:
+            return None
         headers = {
             "Content-Type": "application/octet-stream",
-            "X-Auth-Token": self.get_auth()
+            "X-Auth-Token": token
         }
-        res = requests.get(url, headers=headers)
+        try:
+            with track("modelarts", "log_url") as call:
+                res = self.http.get(url, endpoint="FINETUNE_LOG", headers=headers)
+                if res.status_code != 200:
+                    call.failed()
+        except Exception:
+            logger.exception("get finetune log url failed")
+            return None
         if res.status_code == 200:
             return res.json()
+        if res.status_code == 401:
+            # token已失效，下次重新登录
+            self.iam_token.invalidate()
         return None
 
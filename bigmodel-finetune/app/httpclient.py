@@ -0,0 +1,93 @@
+import os
+import time
+import random
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 需要重试的服务端错误码
+RETRY_STATUS = frozenset([500, 502, 503, 504])
+
+
+class HTTPClient:
+    """
+    每个worker共享的HTTP客户端：连接池、keep-alive、分endpoint超时以及带抖动退避的有限重试
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=20, max_retries=2, backoff_factor=0.2,
+                 timeouts=None, default_timeout=(3, 30)):
+        """
+        :param pool_connections: 缓存的host连接池个数
+        :param pool_maxsize: 每个host连接池的最大连接数
+        :param max_retries: 5xx或连接错误时的最大重试次数
+        :param backoff_factor: 退避基数(秒)，第n次重试等待 backoff_factor * 2^n * [0.5, 1.5)
+        :param timeouts: {endpoint名称: (connect超时, read超时)}
+        :param default_timeout: 未配置的endpoint使用的超时
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, basic_config):
+        timeouts = {}
+        for name in ("IAM", "FINETUNE_LOG"):
+            value = basic_config.get(f"{name}_TIMEOUT")
+            if value:
+                timeouts[name] = tuple(value)
+        return cls(pool_connections=int(basic_config.get("HTTP_POOL_CONNECTIONS", 10)),
+                   pool_maxsize=int(basic_config.get("HTTP_POOL_MAXSIZE", 20)),
+                   max_retries=int(basic_config.get("HTTP_MAX_RETRIES", 2)),
+                   backoff_factor=float(basic_config.get("HTTP_BACKOFF_FACTOR", 0.2)),
+                   timeouts=timeouts)
+
+    @property
+    def session(self):
+        # 连接池不能跨fork共享，按进程懒加载
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                                          pool_maxsize=self.pool_maxsize)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session, self._pid = session, os.getpid()
+        return self._session
+
+    def request(self, method, url, endpoint=None, **kwargs):
+        """
+        :param endpoint: endpoint名称，用于选择超时配置
+        :return: requests.Response，重试耗尽后返回最后一次响应或抛出最后一次连接异常
+        """
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint, self.default_timeout))
+        attempt = 0
+        while True:
+            try:
+                res = self.session.request(method, url, **kwargs)
+                if res.status_code not in RETRY_STATUS or attempt >= self.max_retries:
+                    return res
+                logger.warning("%s %s returned %s, retrying", method, endpoint or url, res.status_code)
+                res.close()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning("%s %s failed, retrying", method, endpoint or url, exc_info=True)
+            time.sleep(self.backoff_factor * (2 ** attempt) * random.uniform(0.5, 1.5))
+            attempt += 1
+
+    def get(self, url, endpoint=None, **kwargs):
+        return self.request("GET", url, endpoint=endpoint, **kwargs)
+
+    def post(self, url, endpoint=None, **kwargs):
+        return self.request("POST", url, endpoint=endpoint, **kwargs)
@@ -0,0 +1,59 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class IAMTokenCache:
+    """
+    缓存IAM token及其过期时间，过期前主动刷新；同一时刻只有一个刷新。
+    token只保存在内存中不落盘，各worker首次使用时分别获取
+    """
+
+    def __init__(self, login, refresh_margin=300):
+        """
+        :param login: 登录函数，返回(token, expire_at)，expire_at为unix时间戳
+        :param refresh_margin: 距过期不足该秒数时刷新
+        """
+        self._login = login
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expire_at = 0
+        self._lock = threading.Lock()
+
+    def _fresh(self, expire_at):
+        return expire_at - time.time() > self.refresh_margin
+
+    def get(self):
+        """
+        :return: 可用的token
+        """
+        if self._token and self._fresh(self._expire_at):
+            return self._token
+
+        # 已有未过期的token且其他调用方正在刷新时，直接使用旧token
+        if not self._lock.acquire(blocking=not self._valid()):
+            return self._token
+        try:
+            if self._token and self._fresh(self._expire_at):
+                return self._token
+            return self._refresh()
+        finally:
+            self._lock.release()
+
+    def _valid(self):
+        return bool(self._token) and self._expire_at > time.time()
+
+    def invalidate(self):
+        self._token = None
+        self._expire_at = 0
+
+    def _refresh(self):
+        try:
+            token, expire_at = self._login()
+        except Exception:
+            self.invalidate()
+            raise
+        self._token, self._expire_at = token, expire_at
+        return token
@@ -0,0 +1,81 @@
+import os
+import time
+import fcntl
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class JobRefresher:
+    """
+    后台刷新本地微调任务表中未到终态的任务；
+    配置lock_file时各worker通过文件锁选出一个执行刷新，其余worker空闲等待
+    """
+
+    def __init__(self, list_pending, fetch_batch, on_update, interval=30, lock_file=None):
+        """
+        :param list_pending: 返回待刷新job_id列表的函数
+        :param fetch_batch: 批量获取微调信息的函数，返回(data, errors)，与get_finetune_info_batch一致
+        :param on_update: 回调on_update(data, errors)，参数为fetch_batch的返回值
+        :param interval: 刷新间隔(秒)
+        :param lock_file: 跨worker互斥的锁文件路径，None表示每个worker都刷新
+        """
+        self._list_pending = list_pending
+        self._fetch_batch = fetch_batch
+        self._on_update = on_update
+        self.interval = interval
+        self.lock_file = lock_file
+        self._lock_fd = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        # 在首次请求时启动，保证线程在fork之后创建
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._lock_fd = None
+            self._thread = threading.Thread(target=self._run, name="job-refresher", daemon=True)
+            self._thread.start()
+
+    def _is_leader(self):
+        if not self.lock_file:
+            return True
+        if self._lock_fd is not None:
+            return True
+        lock_fd = open(self.lock_file, "a")
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_fd.close()
+            return False
+        # 持有锁直到进程退出，退出后由其他worker接替
+        self._lock_fd = lock_fd
+        logger.info("job refresher elected: %s", os.getpid())
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self._is_leader():
+                    self.refresh()
+            except Exception:
+                logger.exception("refresh finetune jobs failed")
+
+    def refresh(self):
+        """
+        刷新一轮
+        :return: int, 本轮刷新的任务数
+        """
+        job_ids = self._list_pending()
+        if not job_ids:
+            return 0
+        data, errors = self._fetch_batch(job_ids)
+        self._on_update(data, errors)
+        return len(data)
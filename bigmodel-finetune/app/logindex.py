@@ -0,0 +1,69 @@
+import threading
+from array import array
+
+
+def split_lines(data):
+    """
+    按换行符拆分日志字节，与LineIndex的行号保持一致
+    :param data: bytes
+    :return: list
+    """
+    lines = data.decode("utf-8", errors="replace").split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+class LineIndex:
+    """
+    日志对象的行偏移索引，对象增长时只读取新追加的字节
+    """
+
+    def __init__(self):
+        # 每一行的起始偏移，最后一个元素为下一行(可能尚未写完)的起始偏移
+        self.offsets = array("Q", [0])
+        # 已建立索引的字节数
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def update(self, obs_client, path, size, chunk_size=1024 * 1024):
+        """
+        将索引扩展到对象当前大小
+        :param obs_client: OBSHandler
+        :param path: 对象路径
+        :param size: 对象当前大小
+        """
+        with self.lock:
+            if size < self.size:
+                # 对象被重写，重新建立索引
+                self.offsets = array("Q", [0])
+                self.size = 0
+            pos = self.size
+            for chunk in obs_client.iter_object(path, self.size, size, chunk_size=chunk_size):
+                start = 0
+                while True:
+                    i = chunk.find(b"\n", start)
+                    if i < 0:
+                        break
+                    self.offsets.append(pos + i + 1)
+                    start = i + 1
+                pos += len(chunk)
+            self.size = pos
+
+    @property
+    def line_count(self):
+        # 末尾未以换行结束的内容也算一行
+        if self.offsets[-1] < self.size:
+            return len(self.offsets)
+        return len(self.offsets) - 1
+
+    def line_span(self, from_line, limit):
+        """
+        :return: (start, stop, 实际行数)，对应[from_line, from_line + limit)行的字节范围
+        """
+        total = self.line_count
+        from_line = max(0, min(from_line, total))
+        to_line = max(from_line, min(from_line + limit, total))
+        start = self.offsets[from_line]
+        stop = self.offsets[to_line] if to_line < len(self.offsets) else self.size
+        return start, stop, to_line - from_line
@@ -0,0 +1,134 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+# ModelArts训练日志的命名为modelarts-job-<job_id>-worker-<n>.log
+DEFAULT_PREFIX_TEMPLATE = "modelarts-job-{job_id}"
+
+
+class LogKeyIndex:
+    """
+    job_id到日志对象key的索引，从上次列举的marker增量刷新，可持久化到文件供各worker共享
+    """
+
+    def __init__(self, obs_client, index_file=None, prefix_template=DEFAULT_PREFIX_TEMPLATE,
+                 rescan_interval=60):
+        """
+        :param obs_client: OBSHandler
+        :param index_file: 持久化文件路径，None表示仅保存在内存
+        :param prefix_template: 未命中时按前缀列举使用的文件名模板，为空时不按前缀列举
+        :param rescan_interval: 同一目录两次全量重新列举的最小间隔(秒)
+        """
+        self.obs_client = obs_client
+        self.index_file = index_file
+        self.prefix_template = prefix_template
+        self.rescan_interval = rescan_interval
+        self._keys = {}  # job_id -> key
+        self._markers = {}  # 日志目录 -> 最后列举到的key
+        self._rescanned_at = {}
+        self._file_mtime = 0
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        key = self._keys.get(job_id)
+        if key is None and self._load():
+            key = self._keys.get(job_id)
+        return key
+
+    def lookup(self, log_dir, job_id):
+        """
+        查找job_id对应的日志key，依次使用索引、增量列举、前缀列举、限频的全量列举
+        :param log_dir: 日志目录
+        :param job_id:
+        :return: string|None
+        """
+        key = self.get(job_id)
+        if key is not None:
+            return key
+        log_dir = "".join([log_dir.rstrip("/"), "/"]) if log_dir else ""
+        with self._lock:
+            key = self._keys.get(job_id)
+            if key is None:
+                self._scan(log_dir, self._markers.get(log_dir, ""))
+                key = self._keys.get(job_id)
+            if key is None and self.prefix_template:
+                self._scan(log_dir + self.prefix_template.format(job_id=job_id), "", update_marker=False)
+                key = self._keys.get(job_id)
+            if key is None and time.monotonic() - self._rescanned_at.get(log_dir, -self.rescan_interval) \
+                    >= self.rescan_interval:
+                # 新key不一定排在marker之后，限频地全量重新列举
+                self._rescanned_at[log_dir] = time.monotonic()
+                self._scan(log_dir, "")
+                key = self._keys.get(job_id)
+        return key
+
+    def job_keys(self, log_dir, job_id):
+        """
+        列出job_id的所有日志key(多个worker时每个worker一个日志)，只按该job的key前缀列举，不遍历整个日志目录
+        :param log_dir: 日志目录
+        :param job_id:
+        :return: list
+        """
+        if not self.prefix_template:
+            key = self.lookup(log_dir, job_id)
+            return [key] if key is not None else []
+        log_dir = "".join([log_dir.rstrip("/"), "/"]) if log_dir else ""
+        prefix = log_dir + self.prefix_template.format(job_id=job_id)
+        return [key for key in self.obs_client.iter_keys(prefix) if job_id in os.path.basename(key)]
+
+    def _scan(self, prefix, marker, update_marker=True):
+        added = {}
+        last_key = marker
+        try:
+            for key in self.obs_client.iter_keys(prefix, marker=marker):
+                last_key = key
+                if key.endswith(".log"):
+                    for job_id in JOB_ID_PATTERN.findall(os.path.basename(key)):
+                        added[job_id] = key
+        except Exception:
+            logger.exception("list log keys failed: %s", prefix)
+        if update_marker and last_key:
+            self._markers[prefix] = max(last_key, self._markers.get(prefix, ""))
+        if added:
+            self._keys.update(added)
+            self._save()
+
+    def _load(self):
+        # 合并其他worker写入的索引
+        if not self.index_file:
+            return False
+        try:
+            mtime = os.path.getmtime(self.index_file)
+            if mtime == self._file_mtime:
+                return False
+            with open(self.index_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self._file_mtime = mtime
+        self._keys.update(data.get("keys", {}))
+        for log_dir, marker in data.get("markers", {}).items():
+            self._markers[log_dir] = max(marker, self._markers.get(log_dir, ""))
+        return True
+
+    def _save(self):
+        if not self.index_file:
+            return
+        self._load()
+        tmp_path = f"{self.index_file}.{os.getpid()}"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"keys": self._keys, "markers": self._markers}, f)
+            os.replace(tmp_path, self.index_file)
+            self._file_mtime = os.path.getmtime(self.index_file)
+        except OSError:
+            logger.warning("failed to save log key index to %s", self.index_file, exc_info=True)
+
+    def discard(self, job_id):
+        self._keys.pop(job_id, None)
@@ -0,0 +1,161 @@
+import os
+import time
+import inspect
+import functools
+import contextvars
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+# gunicorn多进程下需要在导入prometheus_client之前设置PROMETHEUS_MULTIPROC_DIR，由各worker写入共享目录后汇总
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_LATENCY = Histogram("finetune_request_duration_seconds", "HTTP request latency",
+                            ["route", "method", "status"])
+REQUESTS_IN_FLIGHT = Gauge("finetune_requests_in_flight", "HTTP requests being served",
+                           ["route"], multiprocess_mode="livesum")
+DEPENDENCY_LATENCY = Histogram("finetune_dependency_duration_seconds", "Outbound call latency",
+                               ["dependency", "operation"])
+DEPENDENCY_ERRORS = Counter("finetune_dependency_errors_total", "Outbound call errors",
+                            ["dependency", "operation"])
+DEPENDENCY_IN_FLIGHT = Gauge("finetune_dependency_in_flight", "Outbound calls in progress",
+                             ["dependency"], multiprocess_mode="livesum")
+FM_POOL_BUSY = Gauge("finetune_fm_pool_busy", "fm calls running or queued in the bulkhead",
+                     multiprocess_mode="livesum")
+LOG_RECORDS_DROPPED = Counter("finetune_log_records_dropped_total",
+                              "Log records dropped because the log queue was full")
+FM_CIRCUIT_OPEN = Gauge("finetune_fm_circuit_open", "Workers whose fm circuit breaker is not closed",
+                        multiprocess_mode="livesum")
+
+# 当前请求中各外部依赖的累计耗时，{dependency: [次数, 秒]}
+request_breakdown = contextvars.ContextVar("request_breakdown", default=None)
+
+
+def _add_breakdown(dependency, elapsed):
+    breakdown = request_breakdown.get()
+    if breakdown is not None:
+        stat = breakdown.setdefault(dependency, [0, 0.0])
+        stat[0] += 1
+        stat[1] += elapsed
+
+
+class _Call:
+    def __init__(self):
+        self.error = False
+
+    def failed(self):
+        self.error = True
+
+
+@contextmanager
+def track(dependency, operation):
+    """
+    统计一次外部调用的耗时、错误与并发数；异常或调用failed()计为错误
+    :param dependency: fm、obs、iam、modelarts、db
+    :param operation: 具体操作
+    """
+    call = _Call()
+    in_flight = DEPENDENCY_IN_FLIGHT.labels(dependency)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call.failed()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        DEPENDENCY_LATENCY.labels(dependency, operation).observe(elapsed)
+        in_flight.dec()
+        _add_breakdown(dependency, elapsed)
+        if call.error:
+            DEPENDENCY_ERRORS.labels(dependency, operation).inc()
+
+
+def observe(dependency, operation=None, is_error=None):
+    """
+    track的装饰器形式；生成器的耗时取决于调用方的消费速度，不能使用，应在函数内对请求本身使用track
+    :param is_error: 根据返回值判断是否失败的函数
+    """
+    def decorator(func):
+        name = operation or func.__name__
+        if inspect.isgeneratorfunction(func):
+            raise TypeError(f"observe cannot wrap generator function {func.__qualname__}")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(dependency, name) as call:
+                res = func(*args, **kwargs)
+                if is_error is not None and is_error(res):
+                    call.failed()
+                return res
+        return wrapper
+    return decorator
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+    DEPENDENCY_IN_FLIGHT.labels("db").inc()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["metrics_start"].pop()
+    DEPENDENCY_IN_FLIGHT.labels("db").dec()
+    elapsed = time.perf_counter() - start
+    DEPENDENCY_LATENCY.labels("db", _sql_operation(statement)).observe(elapsed)
+    _add_breakdown("db", elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    starts = context.connection.info.get("metrics_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+        DEPENDENCY_IN_FLIGHT.labels("db").dec()
+    DEPENDENCY_ERRORS.labels("db", _sql_operation(context.statement or "")).inc()
+
+
+def _sql_operation(statement):
+    return statement.lstrip().split(" ", 1)[0].upper() or "UNKNOWN"
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def init_app(app):
+    """
+    注册请求耗时统计与/metrics接口
+    """
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_route = _route()
+        REQUESTS_IN_FLIGHT.labels(g.metrics_route).inc()
+
+    @app.after_request
+    def _observe_request(response):
+        if "metrics_start" in g:
+            REQUEST_LATENCY.labels(g.metrics_route, request.method, response.status_code).observe(
+                time.perf_counter() - g.metrics_start)
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        if "metrics_start" in g:
+            REQUESTS_IN_FLIGHT.labels(g.metrics_route).dec()
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        if MULTIPROCESS:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,97 @@
+import math
+import threading
+from array import array
+
+
+def _to_float(match):
+    if match is None:
+        return math.nan
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return math.nan
+
+
+class MetricSeries:
+    """
+    从日志中提取的训练指标时间序列，按列保存在array中；对象增长时只解析新追加的完整行
+    """
+
+    def __init__(self, patterns):
+        """
+        :param patterns: MetricPatterns
+        """
+        self.patterns = patterns
+        self.steps = array("q")
+        self.values = {name: array("d") for name, _ in patterns.metrics}
+        # 已解析到的偏移(最后一个完整行之后)与已读取的字节数
+        self.offset = 0
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def update(self, obs_client, path, size, chunk_size=1024 * 1024):
+        """
+        解析[offset, size)中的完整行
+        :param obs_client: OBSHandler
+        :param path: 对象路径
+        :param size: 对象当前大小
+        """
+        with self.lock:
+            if size < self.size:
+                # 对象被重写，重新解析
+                del self.steps[:]
+                for values in self.values.values():
+                    del values[:]
+                self.offset = 0
+            pending = b""
+            # 读取失败时iter_object会提前结束，只记录实际读到的字节，下次继续读取
+            pos = self.offset
+            for chunk in obs_client.iter_object(path, self.offset, size, chunk_size=chunk_size):
+                pos += len(chunk)
+                data = pending + chunk
+                end = data.rfind(b"\n") + 1
+                if end:
+                    for line in data[:end - 1].decode("utf-8", errors="replace").split("\n"):
+                        self._parse_line(line)
+                    self.offset += end
+                pending = data[end:]
+            # 未写完的行留到下次解析
+            self.size = pos
+
+    def _parse_line(self, line):
+        # 不抛出异常，避免一个块中前面的行已追加而offset未前进，下次重复解析
+        match = self.patterns.step.search(line)
+        if match is None:
+            return
+        try:
+            step = int(match.group(1))
+        except ValueError:
+            return
+        values = [_to_float(pattern.search(line)) for _, pattern in self.patterns.metrics]
+        if values and all(math.isnan(value) for value in values):
+            return
+        self.steps.append(step)
+        for (name, _), value in zip(self.patterns.metrics, values):
+            self.values[name].append(value)
+
+    def points(self, since_step=None, limit=None):
+        """
+        :param since_step: 只返回step大于该值的点
+        :param limit: 最多返回的点数
+        :return: dict, steps与各指标按列返回，缺失的值为None
+        """
+        with self.lock:
+            start = 0
+            if since_step is not None:
+                while start < len(self.steps) and self.steps[start] <= since_step:
+                    start += 1
+            stop = len(self.steps) if limit is None else min(len(self.steps), start + limit)
+            steps = self.steps[start:stop].tolist()
+            metrics = {name: [None if math.isnan(value) else value for value in values[start:stop]]
+                       for name, values in self.values.items()}
+            return {
+                "steps": steps,
+                "metrics": metrics,
+                "next_step": steps[-1] if steps else since_step,
+                "total_points": len(self.steps)
+            }
@@ -1,6 +1,11 @@
 import os
+import logging
 
-from obs import ObsClient
+from obs import ObsClient, GetObjectHeader, DeleteObjectsRequest, Object
+
+from .metrics import observe, track
+
+logger = logging.getLogger(__name__)
 
 
 class OBSHandler:
@@ -10,15 +15,28 @@ class OBSHandler:
         self.bucket_name = basic_config["BUCKET_NAME"] if bucket_name is None else bucket_name
         self.endpoint = basic_config["OBS_ENDPOINT"]
         self.maxkeys = 1000  # 查询的对象最大个数, 最大为1000
-        self.obs_client = ObsClient(
-            access_key_id=self.access_key,
-            secret_access_key=self.secret_key,
-            server=self.endpoint
-        )
+        self.max_delete_keys = 1000  # 批量删除单次请求的最大对象数, 最大为1000
+        self._obs_client = None
+        self._pid = None
+
+    @property
+    def obs_client(self):
+        # 连接不能跨fork共享，在每个进程首次使用时创建
+        if self._obs_client is None or self._pid != os.getpid():
+            self._obs_client = ObsClient(
+                access_key_id=self.access_key,
+                secret_access_key=self.secret_key,
+                server=self.endpoint
+            )
+            self._pid = os.getpid()
+        return self._obs_client
 
     def close_obs(self):
-        self.obs_client.close()
+        if self._obs_client is not None and self._pid == os.getpid():
+            self._obs_client.close()
+        self._obs_client = None
 
+    @observe("obs", "listObjects")
     def get_obj_by_delimeter(self, source_dir, delimiter="/"):
         """
         以delimiter分组获取文件夹下一层的文件路径
@@ -28,6 +46,8 @@ class OBSHandler:
                 source_dir = "".join([source_dir.rstrip("/"), "/"])
 
             object_list = []
+            # 逐个key的日志只在DEBUG级别输出
+            debug = logger.isEnabledFor(logging.DEBUG)
             flag = True
             index = 1
             marker = ""
@@ -39,27 +59,51 @@ class OBSHandler:
                     for content in resp_list.body.contents:
                         filepath = content.key
                         if filepath.endswith("/") is False:
-                            print('[file][%s] : key: %s' %
-                                  (str(index), filepath))
+                            if debug:
+                                logger.debug('[file][%s] : key: %s', index, filepath)
                             object_list.append(filepath)
                             index += 1
                     flag = resp_list.body.is_truncated
                     marker = resp_list.body.next_marker
                 else:
-                    print('errorCode:%s\terrorMessage:%s' %
-                          (resp_list.errorCode, resp_list.errorMessage))
+                    logger.error('errorCode:%s\terrorMessage:%s',
+                                 resp_list.errorCode, resp_list.errorMessage)
                     break
         except:
-            import traceback
-            print(traceback.format_exc())
+            logger.exception("list objects failed")
         return object_list
 
+    def iter_keys(self, source_dir, marker="", delimiter="/"):
+        """
+        从marker之后分页遍历文件夹下一层的文件路径，不打印每个key
+        :param source_dir: 文件夹或者key前缀
+        :param marker: 从该key之后开始列举
+        :return: 文件路径生成器
+        """
+        while True:
+            # 只统计每次列举请求的耗时，不包含调用方处理key的时间
+            with track("obs", "listObjects") as call:
+                resp_list = self.obs_client.listObjects(self.bucket_name, prefix=source_dir, delimiter=delimiter,
+                                                        marker=marker, max_keys=self.maxkeys)
+                if resp_list.status >= 300:
+                    call.failed()
+            if resp_list.status >= 300:
+                raise RuntimeError('errorCode:%s\terrorMessage:%s' %
+                                   (resp_list.errorCode, resp_list.errorMessage))
+            for content in resp_list.body.contents:
+                if content.key.endswith("/") is False:
+                    yield content.key
+            if not resp_list.body.is_truncated:
+                break
+            marker = resp_list.body.next_marker
+
     def get_log_by_id(self, path_list, job_id):
         for path in path_list:
             if path.endswith(".log") is True and path.find(job_id) != -1:
                 return path
         return None
 
+    @observe("obs", "getObject")
     def read_file(self, path):
         """
         二进制读取文件
@@ -79,13 +123,102 @@ class OBSHandler:
                 # 获取对象内容
                 return content
             else:
-                print("获取失败，失败码: %s\t 失败消息: %s" %
-                      (resp.errorCode, resp.errorMessage))
+                logger.error("获取失败，失败码: %s\t 失败消息: %s",
+                             resp.errorCode, resp.errorMessage)
         except:
-            import traceback
-            print(traceback.format_exc())
+            logger.exception("read file failed")
         return content
 
+    @observe("obs", "getObjectMetadata", is_error=lambda res: res is None)
+    def get_object_meta(self, path):
+        """
+        获取对象元数据
+        :param path:
+        :return: dict|None, 包含size、etag、last_modified
+        """
+        try:
+            resp = self.obs_client.getObjectMetadata(self.bucket_name, path)
+            if resp.status < 300:
+                return {
+                    "size": int(resp.body.contentLength or 0),
+                    "etag": resp.body.etag,
+                    "last_modified": resp.body.lastModified
+                }
+            else:
+                # 对象不存在是正常情况，例如上传前检查
+                logger.debug("获取元数据失败，失败码: %s\t 失败消息: %s",
+                             resp.errorCode, resp.errorMessage)
+        except:
+            logger.exception("get object metadata failed")
+        return None
+
+    @observe("obs", "getObject", is_error=lambda res: res[1] is None)
+    def open_object(self, path, start=0, stop=None):
+        """
+        发起对象[start, stop)字节的读取请求，耗时统计到收到响应头为止
+        :param path:
+        :param start: 起始偏移
+        :param stop: 结束偏移(不包含)，None表示读到对象末尾
+        :return: (OBS返回的状态码, 响应体的流)，失败时流为None，请求异常时状态码为None
+        """
+        byte_range = f"{start}-" if stop is None else f"{start}-{stop - 1}"
+        try:
+            resp = self.obs_client.getObject(
+                self.bucket_name, path, headers=GetObjectHeader(range=byte_range), loadStreamInMemory=False)
+        except Exception:
+            logger.exception("get object failed")
+            return None, None
+        if resp.status >= 300:
+            logger.error("获取失败，失败码: %s\t 失败消息: %s",
+                         resp.errorCode, resp.errorMessage)
+            return resp.status, None
+        return resp.status, resp.body.response
+
+    def iter_stream(self, stream, length=None, chunk_size=64 * 1024):
+        """
+        分块读取open_object返回的流，读完后关闭
+        :param stream: 响应体的流
+        :param length: 期望的字节数，不足时抛出IOError，避免把截断的内容当作完整内容返回
+        :param chunk_size: 每次读取的字节数
+        :return: bytes生成器
+        """
+        received = 0
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                received += len(chunk)
+                yield chunk
+        finally:
+            stream.close()
+        if length is not None and received < length:
+            raise IOError(f"object stream truncated: {received}/{length} bytes")
+
+    def iter_object(self, path, start=0, stop=None, chunk_size=64 * 1024):
+        """
+        分块流式读取对象的[start, stop)字节，不在内存中保存整个对象
+        :param path:
+        :param start: 起始偏移
+        :param stop: 结束偏移(不包含)，None表示读到对象末尾
+        :param chunk_size: 每次读取的字节数
+        :return: bytes生成器
+        """
+        if stop is not None and stop <= start:
+            return
+        _, stream = self.open_object(path, start, stop)
+        if stream is None:
+            return
+        yield from self.iter_stream(stream, chunk_size=chunk_size)
+
+    def read_range(self, path, start=0, stop=None):
+        """
+        读取对象的[start, stop)字节
+        :return: bytes
+        """
+        return b"".join(self.iter_object(path, start, stop))
+
+    @observe("obs", "putContent", is_error=lambda res: res is False)
     def put_content(self, target_path, content):
         try:
             resp = self.obs_client.putContent(
@@ -94,9 +227,34 @@ class OBSHandler:
             if resp.status < 300:
                 return True
             else:
-                print('errorCode:', resp.errorCode)
-                print('errorMessage:', resp.errorMessage)
+                logger.error('errorCode:%s\terrorMessage:%s', resp.errorCode, resp.errorMessage)
         except:
-            import traceback
-            print(traceback.format_exc())
+            logger.exception("put content failed")
         return False
+
+    @observe("obs", "deleteObjects", is_error=bool)
+    def delete_objects(self, keys):
+        """
+        批量删除对象，每次请求最多max_delete_keys个key
+        :param keys: 对象key列表
+        :return: list, 删除失败的key
+        """
+        keys = list(dict.fromkeys(keys))
+        failed = []
+        for i in range(0, len(keys), self.max_delete_keys):
+            chunk = keys[i:i + self.max_delete_keys]
+            try:
+                # quiet模式下响应中只返回删除失败的对象
+                resp = self.obs_client.deleteObjects(
+                    self.bucket_name, DeleteObjectsRequest(quiet=True, objects=[Object(key=key) for key in chunk]))
+                if resp.status < 300:
+                    for error in resp.body.error or []:
+                        logger.error("delete object failed: %s %s %s", error.key, error.code, error.message)
+                        failed.append(error.key)
+                else:
+                    logger.error('errorCode:%s\terrorMessage:%s', resp.errorCode, resp.errorMessage)
+                    failed.extend(chunk)
+            except:
+                logger.exception("delete objects failed")
+                failed.extend(chunk)
+        return failed
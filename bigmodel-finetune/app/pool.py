@@ -0,0 +1,75 @@
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_concurrently(func, items, max_workers=8):
+    """
+    以有界线程池并发执行func(item)，gevent worker下线程会被patch为协程
+    :param func: 单个item的处理函数
+    :param items: 待处理列表
+    :param max_workers: 最大并发数
+    :return: list, 与items顺序一致的(result, error)，error为None表示成功
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    def call(item):
+        try:
+            return func(item), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        # 复制调用方的上下文，使请求级的耗时统计覆盖线程池中的调用
+        futures = [executor.submit(contextvars.copy_context().run, call, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def run_in_threadpool(func, *args):
+    """
+    在gevent原生线程池中执行CPU密集的函数，避免阻塞gevent hub；未启用gevent时直接执行
+    :param func:
+    :param args:
+    :return: func的返回值
+    """
+    try:
+        from gevent import monkey, get_hub
+    except ImportError:
+        return func(*args)
+    if not monkey.is_module_patched("threading"):
+        return func(*args)
+    return get_hub().threadpool.apply(func, args)
+
+
+class RateLimiter:
+    """
+    令牌桶限流，acquire在没有令牌时阻塞等待
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        :param rate: 每秒产生的令牌数，None或者<=0表示不限流
+        :param burst: 桶容量
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,70 @@
+import os
+import time
+import random
+import pstats
+import cProfile
+import threading
+
+from flask import g, request
+
+from .metrics import request_breakdown
+
+# 每个worker同一时刻只允许一个profiler
+_profile_lock = threading.Lock()
+
+
+def init_app(app, basic_config):
+    """
+    注册按请求采样的profiling与慢请求耗时分解日志
+    :param app: Flask应用
+    :param basic_config: asset.yml配置
+    """
+    profile_dir = os.path.join(os.environ.get("FINETUNE_LOG_DIR", "log"), "profiles")
+    sample_rate = float(basic_config.get("PROFILE_SAMPLE_RATE", 0))
+    header_enabled = bool(basic_config.get("PROFILE_HEADER_ENABLED", False))
+    slow_threshold = float(basic_config.get("SLOW_REQUEST_THRESHOLD", 10))
+
+    def should_profile():
+        if header_enabled and request.headers.get("X-Profile") == "1":
+            return True
+        return sample_rate > 0 and random.random() < sample_rate
+
+    @app.before_request
+    def _start_profiling():
+        g.request_start = time.perf_counter()
+        g.breakdown_token = request_breakdown.set({})
+        if should_profile() and _profile_lock.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.teardown_request
+    def _finish_profiling(exc):
+        if "request_start" not in g:
+            return
+        elapsed = time.perf_counter() - g.request_start
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+            _dump_profile(app, profiler, profile_dir, route, elapsed)
+
+        breakdown = request_breakdown.get() or {}
+        request_breakdown.reset(g.breakdown_token)
+        if elapsed >= slow_threshold:
+            detail = ", ".join(f"{dependency}={count}x{seconds:.3f}s"
+                               for dependency, (count, seconds) in sorted(breakdown.items()))
+            app.logger.warning(f"slow request: {request.method} {route} {elapsed:.3f}s [{detail}]")
+
+
+def _dump_profile(app, profiler, profile_dir, route, elapsed):
+    try:
+        if not os.path.exists(profile_dir):
+            os.makedirs(profile_dir)
+        name = "_".join([time.strftime("%Y%m%d%H%M%S"), str(os.getpid()),
+                         route.strip("/").replace("/", "_").replace("<", "").replace(">", "").replace(":", "_")])
+        path = os.path.join(profile_dir, name + ".prof")
+        pstats.Stats(profiler).dump_stats(path)
+        app.logger.info(f"profile saved: {path} ({elapsed:.3f}s)")
+    except Exception:
+        app.logger.exception("save profile failed")
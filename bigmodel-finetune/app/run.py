@@ -1,20 +1,35 @@
 #!/usr/bin/env python
 import os
 import time
+import tempfile
+import signal
+import json
+import hashlib
 import logging
+from collections import namedtuple
 
-from flask import Flask, abort, request, jsonify, g, url_for, make_response
+from flask import Flask, Response, abort, request, jsonify, g, url_for, make_response
 from flask_httpauth import HTTPTokenAuth
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
 from flask_cors import *
 from authlib.jose import jwt
 from authlib.jose.errors import ExpiredTokenError
 from werkzeug.security import generate_password_hash, check_password_hash
 
-from .fmh import FoundationModelHandler, BASIC_CONFIG
+from . import applog, compression, metrics, profiling
+from .bulkhead import FMUnavailableError
+from .cache import TTLCache
+from .jobindex import JobRefresher
+from .pool import run_in_threadpool
+from .submission import SubmissionQueue, TICKET_PENDING
+from .fmh import FoundationModelHandler, BASIC_CONFIG, JOB_NOT_FOUND, TERMINAL_PHASES, load_snapshot, \
+    reload_snapshot
+from .util import gen_uuid
 
 
 app = Flask(__name__)
+# OBS、HTTP等客户端在fork后首次使用时才创建，preload时可在master中构造
 fmh = FoundationModelHandler()
 
 CORS(app, supports_credentials=True)
@@ -26,12 +41,43 @@ app.config["SECRET_KEY"] = basic_config['SECRET_KEY']
 app.config["SQLALCHEMY_DATABASE_URI"] = basic_config['FINETUNE_MYSQL_URI']
 app.config["SQLALCHEMY_COMMIT_ON_TEARDOWN"] = True
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = True
+# 批量接口单次请求的最大job数
+BATCH_MAX_SIZE = int(basic_config.get("BATCH_MAX_SIZE", 200))
+# 长轮询最长等待时间，需小于gunicorn的timeout
+LONGPOLL_MAX_WAIT = float(basic_config.get("LONGPOLL_MAX_WAIT", 50))
+SSE_KEEPALIVE = float(basic_config.get("SSE_KEEPALIVE", 15))
+LOG_CHUNK_SIZE = int(basic_config.get("LOG_CHUNK_SIZE", 64 * 1024))
+LOG_LINES_MAX_LIMIT = int(basic_config.get("LOG_LINES_MAX_LIMIT", 1000))
+METRIC_POINTS_MAX_LIMIT = int(basic_config.get("METRIC_POINTS_MAX_LIMIT", 10000))
+# access token与refresh token有效期(秒)
+TOKEN_DURATION = int(basic_config.get("TOKEN_DURATION", 600))
+REFRESH_TOKEN_DURATION = int(basic_config.get("REFRESH_TOKEN_DURATION", 7 * 24 * 3600))
+REFRESH_TOKEN_TYPE = "refresh"
+# 任务列表单页最大条数
+JOB_PAGE_MAX_SIZE = int(basic_config.get("JOB_PAGE_MAX_SIZE", 100))
+# 允许调用管理接口的用户
+ADMIN_USERS = frozenset(basic_config.get("ADMIN_USERS", []))
+
+# 认证通过的用户，直接取自已签名的JWT声明，无需查询数据库
+AuthUser = namedtuple("AuthUser", ["id", "username", "password_version"], defaults=[None])
+# 需要完整用户信息时使用的缓存，缓存的是与session无关的CachedUser
+CachedUser = namedtuple("CachedUser", ["id", "username", "password_hash"])
+user_cache = TTLCache(maxsize=int(basic_config.get("USER_CACHE_SIZE", 1024)),
+                      ttl=float(basic_config.get("USER_CACHE_TTL", 60)))
+# user_id -> 时间戳，该时间之前签发的token失效(仅对当前worker生效，其余worker在token过期后失效)
+revoked_before = {}
 
 gunicorn_logger = logging.getLogger("gunicorn.error")
-app.logger.handlers = gunicorn_logger.handlers
-app.logger.setLevel(gunicorn_logger.level)
+applog.setup_logging(app, basic_config, gunicorn_logger.handlers)
 
 auth = HTTPTokenAuth(scheme="JWT")
+metrics.init_app(app)
+profiling.init_app(app, basic_config)
+
+# 日志与列表类接口的大响应按Accept-Encoding压缩
+compression.init_app(app, basic_config, endpoints=[
+    "list_finetune", "batch_get_finetune", "stream_log", "get_log_content", "get_finetune_metrics"
+])
 
 # extensions
 db = SQLAlchemy(app)
@@ -44,38 +90,249 @@ class User(db.Model):
     password_hash = db.Column(db.String(128))
 
     def hash_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # 哈希计算耗CPU，放到线程池中避免阻塞gevent hub
+        self.password_hash = run_in_threadpool(generate_password_hash, password)
 
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return run_in_threadpool(check_password_hash, self.password_hash, password)
 
     def generate_auth_token(self, duration=60):
-        # 设置 JWT 头部信息
-        header = {"alg": "HS256"}
-        # 设置 JWT 负载信息
-        expiration = int(time.time()) + duration
-        payload = {
-            "sub": self.id,
-            "name": self.username,
-            "exp": expiration
-        }
-        # 生成JWT
-        token = jwt.encode(header, payload, app.config["SECRET_KEY"])
-        return jsonify({"token": token.decode("utf-8")})
+        token = encode_token(self.id, self.username, duration)
+        return jsonify({"token": token})
+
+    def generate_refresh_token(self, duration=REFRESH_TOKEN_DURATION):
+        return encode_token(self.id, self.username, duration, token_type=REFRESH_TOKEN_TYPE,
+                            password_hash=self.password_hash)
 
     @staticmethod
     def verify_auth_token(token):
-        try:
-            # 验证并解码 JWT
-            claims = jwt.decode(token, app.config["SECRET_KEY"])
-            # 获取当前用户信息
-            user = User.query.get(claims["sub"])
-        except ExpiredTokenError:
-            app.logger.info("token invalid")
-            return None
-        except Exception:
+        return decode_token(token)
+
+
+def password_version(password_hash):
+    """
+    密码哈希的摘要，写入refresh token，修改密码后旧的refresh token随之失效
+    :param password_hash:
+    :return: string
+    """
+    return hashlib.sha256((password_hash or "").encode("utf-8")).hexdigest()[:16]
+
+
+def encode_token(user_id, username, duration, token_type=None, password_hash=None):
+    """
+    签发JWT
+    :param token_type: None为access token，refresh为refresh token
+    :param password_hash: 不为None时写入密码版本声明
+    :return: string
+    """
+    # 设置 JWT 头部信息
+    header = {"alg": "HS256"}
+    # 设置 JWT 负载信息
+    now = int(time.time())
+    payload = {
+        "sub": user_id,
+        "name": username,
+        "iat": now,
+        "exp": now + duration
+    }
+    if token_type:
+        payload["typ"] = token_type
+    if password_hash is not None:
+        payload["pwv"] = password_version(password_hash)
+    # 生成JWT
+    return jwt.encode(header, payload, app.config["SECRET_KEY"]).decode("utf-8")
+
+
+def decode_token(token, token_type=None):
+    """
+    校验JWT，签名和有效期通过即信任其中的用户信息
+    :param token_type: 期望的token类型，None为access token
+    :return: AuthUser|None
+    """
+    try:
+        claims = jwt.decode(token, app.config["SECRET_KEY"])
+        claims.validate()
+        user = AuthUser(id=claims["sub"], username=claims["name"], password_version=claims.get("pwv"))
+    except ExpiredTokenError:
+        app.logger.info("token invalid")
+        return None
+    except Exception:
+        return None
+    if claims.get("typ") != token_type:
+        return None
+    if claims.get("iat", 0) < revoked_before.get(user.id, 0):
+        app.logger.info("token revoked")
+        return None
+    return user
+
+
+def load_user(user_id):
+    """
+    获取完整用户信息，优先读取缓存
+    :param user_id:
+    :return: CachedUser|None
+    """
+    def load():
+        user = User.query.get(user_id)
+        if user is None:
             return None
-        return user
+        return CachedUser(id=user.id, username=user.username, password_hash=user.password_hash)
+
+    return user_cache.get_or_load(user_id, load)
+
+
+def invalidate_user(user_id):
+    """
+    用户被删除或修改密码后调用，清理缓存并使已签发的token失效
+    :param user_id:
+    :return:
+    """
+    user_cache.invalidate(user_id)
+    revoked_before[user_id] = int(time.time())
+
+
+@event.listens_for(User, "after_delete")
+def _on_user_deleted(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _on_user_updated(mapper, connection, target):
+    if inspect(target).attrs.password_hash.history.has_changes():
+        invalidate_user(target.id)
+
+
+class FinetuneTicket(db.Model):
+    __tablename__ = basic_config.get("FINETUNE_TICKET_TABLE", "finetune_ticket")
+    id = db.Column(db.String(32), primary_key=True)
+    user = db.Column(db.String(64), index=True)
+    status = db.Column(db.String(16))
+    job_id = db.Column(db.String(64))
+    msg = db.Column(db.String(256))
+    created_at = db.Column(db.Integer)
+    updated_at = db.Column(db.Integer)
+
+    def to_dict(self):
+        return {
+            "ticket_id": self.id,
+            "user": self.user,
+            "status": self.status,
+            "job_id": self.job_id,
+            "msg": self.msg,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+def update_ticket(ticket_id, status, job_id=None, msg=None):
+    # 后台提交线程中没有请求上下文，需要单独的应用上下文
+    with app.app_context():
+        ticket = FinetuneTicket.query.get(ticket_id)
+        if ticket is None:
+            return
+        ticket.status = status
+        ticket.job_id = job_id
+        ticket.msg = msg
+        ticket.updated_at = int(time.time())
+        db.session.commit()
+
+
+class FinetuneJob(db.Model):
+    __tablename__ = basic_config.get("FINETUNE_JOB_TABLE", "finetune_job")
+    __table_args__ = (db.Index("ix_finetune_job_user_phase", "user", "phase"),)
+    job_id = db.Column(db.String(64), primary_key=True)
+    user = db.Column(db.String(64), index=True)
+    task_name = db.Column(db.String(128), index=True)
+    foundation_model = db.Column(db.String(64), index=True)
+    phase = db.Column(db.String(32), index=True)
+    created_at = db.Column(db.Integer, index=True)
+    runtime = db.Column(db.Integer)
+    updated_at = db.Column(db.Integer, index=True)
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "user": self.user,
+            "task_name": self.task_name,
+            "foundation_model": self.foundation_model,
+            "phase": self.phase,
+            "created_at": self.created_at,
+            "runtime": self.runtime,
+            "updated_at": self.updated_at
+        }
+
+
+def record_finetune_job(event, job):
+    # 可能在异步提交线程中调用，需要单独的应用上下文
+    with app.app_context():
+        if event == "created":
+            now = int(time.time())
+            db.session.merge(FinetuneJob(job_id=job["job_id"], user=job["user"], task_name=job["task_name"],
+                                         foundation_model=job["foundation_model"], created_at=now, updated_at=now))
+        elif event == "deleted":
+            FinetuneJob.query.filter_by(job_id=job["job_id"]).delete()
+        db.session.commit()
+
+
+def list_pending_jobs():
+    # 按上次刷新时间排序，任务较多时每轮刷新最久未更新的一批
+    with app.app_context():
+        query = FinetuneJob.query.filter(db.or_(FinetuneJob.phase.is_(None),
+                                                FinetuneJob.phase.notin_(TERMINAL_PHASES)))
+        query = query.with_entities(FinetuneJob.job_id).order_by(FinetuneJob.updated_at).limit(BATCH_MAX_SIZE)
+        return [job_id for job_id, in query]
+
+
+def update_finetune_jobs(data, errors):
+    with app.app_context():
+        now = int(time.time())
+        for job_id, info in data.items():
+            FinetuneJob.query.filter_by(job_id=job_id).update(
+                {"phase": info["phase"], "runtime": info["runtime"], "updated_at": now})
+        missing = [job_id for job_id, error in errors.items() if error == JOB_NOT_FOUND]
+        if missing:
+            FinetuneJob.query.filter(FinetuneJob.job_id.in_(missing)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+fmh.add_job_listener(record_finetune_job)
+# 本地任务表的后台刷新，同一时刻只有一个worker执行
+job_refresher = JobRefresher(list_pending_jobs, fmh.get_finetune_info_batch, update_finetune_jobs,
+                             interval=float(basic_config.get("JOB_REFRESH_INTERVAL", 30)),
+                             lock_file=basic_config.get("JOB_REFRESH_LOCK_FILE") or os.path.join(
+                                 os.environ.get("FINETUNE_LOG_DIR", tempfile.gettempdir()), "job_refresh.lock"))
+
+# 异步提交队列，并发数与速率限制针对fm后端
+submission_queue = SubmissionQueue(fmh.create_finetune_by_user, update_ticket,
+                                   concurrency=int(basic_config.get("SUBMIT_CONCURRENCY", 2)),
+                                   rate=float(basic_config.get("SUBMIT_RATE", 0)) or None,
+                                   maxsize=int(basic_config.get("SUBMIT_QUEUE_SIZE", 100)))
+
+with app.app_context():
+    try:
+        db.create_all()
+    except Exception:
+        app.logger.exception("create tables failed")
+
+
+# worker启动与首个请求的时间，用于统计启动耗时；preload时由post_fork重置
+startup = {"started_at": time.time(), "first_request_at": None}
+
+
+def mark_worker_started():
+    startup["started_at"] = time.time()
+    startup["first_request_at"] = None
+    # preload时master中建立的数据库连接不能在worker间共享
+    with app.app_context():
+        db.engine.dispose()
+
+
+@app.before_request
+def record_first_request():
+    job_refresher.ensure_started()
+    if startup["first_request_at"] is None:
+        startup["first_request_at"] = time.time()
+        app.logger.info(f"time to first request: {startup['first_request_at'] - startup['started_at']:.3f}s")
 
 
 @auth.verify_token
@@ -99,6 +356,24 @@ def bad_request(error):
     return make_response(jsonify({"error": "Bad Request"}), 400)
 
 
+@app.errorhandler(FMUnavailableError)
+def fm_unavailable(error):
+    app.logger.warning(f"fm unavailable: {error}")
+    return make_response(jsonify({"status": -1, "msg": "微调服务繁忙，请稍后重试"}), 503)
+
+
+def make_etag(*parts):
+    return hashlib.sha1(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+def conditional_response(response, etag):
+    """
+    设置ETag，客户端If-None-Match匹配时返回304；压缩后内容不同，使用弱ETag
+    """
+    response.set_etag(etag, weak=True)
+    return response.make_conditional(request)
+
+
 @app.route("/health", methods=["GET"])
 def health_func():
     return jsonify({"health": "true"})
@@ -125,7 +400,7 @@ def new_user():
 
 @app.route("/foundation-model/users/<int:id>")
 def get_user(id):
-    user = User.query.get(id)
+    user = load_user(id)
     if not user:
         abort(400)
     return jsonify({"username": user.username})
@@ -145,16 +420,53 @@ def get_auth_token():
     if not user.verify_password(password):
         return jsonify({"status": "-1", "msg": "用户名或者密码错误"})
     g.user = user
-    duration = 600
+    duration = TOKEN_DURATION
     token = g.user.generate_auth_token(duration)
     return jsonify({
         "status": 200,
         "msg": "获取token成功",
         "token": token.json["token"],
+        "duration": duration,
+        "refresh_token": g.user.generate_refresh_token(),
+        "refresh_duration": REFRESH_TOKEN_DURATION
+    })
+
+
+@app.route("/foundation-model/token/refresh", methods=["POST"])
+def refresh_auth_token():
+    if request.json is None:
+        abort(400)
+    refresh_token = request.json.get("refresh_token")
+    if refresh_token is None:
+        abort(400)  # missing arguments
+    # 无需重新校验密码，refresh token有效即签发新的access token
+    user = decode_token(refresh_token, token_type=REFRESH_TOKEN_TYPE)
+    if not user:
+        return jsonify({"status": "-1", "msg": "refresh token无效或已过期"})
+    # revoked_before仅对当前worker生效，还需对照缓存的用户信息：用户被删除或修改密码后拒绝刷新
+    cached = load_user(user.id)
+    if cached is None or user.password_version != password_version(cached.password_hash):
+        app.logger.info("refresh token revoked")
+        return jsonify({"status": "-1", "msg": "refresh token无效或已过期"})
+    duration = TOKEN_DURATION
+    return jsonify({
+        "status": 200,
+        "msg": "刷新token成功",
+        "token": encode_token(user.id, user.username, duration),
         "duration": duration
     })
 
 
+def parse_parameters(parameters):
+    params = {}
+    # name value
+    #  "parameters": [{"name": "epochs", "value": "2"}, {"name": "start_learning_rate", "value": "0.001"}, {"name": "end_learning_rate", "value": "0.00001"}]
+    if parameters:
+        for param in parameters:
+            params[param["name"]] = param["value"]
+    return params
+
+
 @app.route("/v1/foundation-model/finetune", methods=["POST"])
 @auth.login_required
 def create_finetune():
@@ -169,14 +481,14 @@ def create_finetune():
     task_name = data.get("task_name")
     foundation_model = data.get("foundation_model")
     task_type = data.get("task_type")
-    parameters = data.get("parameters", None)
-    params = {}
-    # name value
-    #  "parameters": [{"name": "epochs", "value": "2"}, {"name": "start_learning_rate", "value": "0.001"}, {"name": "end_learning_rate", "value": "0.00001"}]
-    if parameters:
-        for param in parameters:
-            params[param["name"]] = param["value"]
+    params = parse_parameters(data.get("parameters", None))
     app.logger.info(f"params: {params}")
+    if request.args.get("async") in ("1", "true"):
+        return submit_finetune_async(user=user,
+                                     task_name=task_name,
+                                     foundation_model=foundation_model,
+                                     task_type=task_type,
+                                     **params)
     res = fmh.create_finetune_by_user(user=user,
                                       task_name=task_name,
                                       foundation_model=foundation_model,
@@ -188,15 +500,173 @@ def create_finetune():
     return jsonify({"status": 201, "msg": "创建微调任务成功", "job_id": res}), 201
 
 
+def submit_finetune_async(user, **kwargs):
+    now = int(time.time())
+    ticket = FinetuneTicket(id=gen_uuid(32), user=user, status=TICKET_PENDING, created_at=now, updated_at=now)
+    db.session.add(ticket)
+    db.session.commit()
+    if not submission_queue.enqueue(ticket.id, user=user, **kwargs):
+        db.session.delete(ticket)
+        db.session.commit()
+        return jsonify({"status": -1, "msg": "提交队列已满，请稍后重试"}), 429
+    app.logger.info(f"ticket: {ticket.id}")
+    return jsonify({"status": 202, "msg": "微调任务已提交", "ticket_id": ticket.id}), 202
+
+
+@app.route("/v1/foundation-model/finetune", methods=["GET"])
+@auth.login_required
+def list_finetune():
+    # 只查询本地任务表，不调用fm
+    page = request.args.get("page", 1, type=int)
+    page_size = request.args.get("page_size", 20, type=int)
+    query = FinetuneJob.query
+    user = request.args.get("user")
+    if user:
+        query = query.filter_by(user=user)
+    phase = request.args.get("phase")
+    if phase:
+        query = query.filter(FinetuneJob.phase.in_(phase.split(",")))
+    pagination = query.order_by(FinetuneJob.created_at.desc()).paginate(
+        page=page, per_page=page_size, max_per_page=JOB_PAGE_MAX_SIZE, error_out=False)
+    return jsonify({"status": 200, "msg": "查询微调任务列表成功", "data": {
+        "jobs": [job.to_dict() for job in pagination.items],
+        "total": pagination.total,
+        "page": pagination.page,
+        "page_size": pagination.per_page
+    }})
+
+
+@app.route("/v1/foundation-model/finetune/tickets/<string:ticket_id>", methods=["GET"])
+@auth.login_required
+def get_ticket(ticket_id):
+    ticket = FinetuneTicket.query.get(ticket_id)
+    if ticket is None:
+        return jsonify({"status": -1, "msg": "ticket不存在"}), 200
+    return jsonify({"status": 200, "msg": "查询提交状态成功", "data": ticket.to_dict()})
+
+
+@app.route("/v1/foundation-model/finetune:batchCreate", methods=["POST"])
+@auth.login_required
+def batch_create_finetune():
+    if not request.json:
+        abort(400)
+    jobs = request.json.get("jobs")
+    if not isinstance(jobs, list) or not jobs:
+        abort(400)
+    if len(jobs) > BATCH_MAX_SIZE:
+        return jsonify({"status": -1, "msg": f"单次最多创建{BATCH_MAX_SIZE}个微调任务"}), 201
+    specs = []
+    for job in jobs:
+        if not isinstance(job, dict):
+            abort(400)
+        for key in ["user", "task_name", "foundation_model", "task_type"]:
+            if not isinstance(job.get(key), str):
+                abort(400)
+        specs.append({
+            "user": job["user"],
+            "task_name": job["task_name"],
+            "foundation_model": job["foundation_model"],
+            "task_type": job["task_type"],
+            "parameters": parse_parameters(job.get("parameters", None))
+        })
+    app.logger.info(f"batch create: {len(specs)} jobs")
+    res = fmh.create_finetune_batch(specs)
+    failed = sum(1 for item in res if "error" in item)
+    app.logger.info(f"res: {len(res) - failed} created, {failed} failed")
+    if failed == len(res):
+        return jsonify({"status": -1, "msg": "批量创建微调任务失败", "data": res}), 201
+    return jsonify({"status": 201, "msg": "批量创建微调任务完成", "data": res}), 201
+
+
 @app.route("/v1/foundation-model/finetune/<string:job_id>", methods=["GET"])
 @auth.login_required
 def get_finetune(job_id):
     app.logger.info(f"get: {job_id}")
-    res = fmh.get_finetune_info(job_id)
+    wait = request.args.get("wait", type=float)
+    if wait:
+        # 长轮询：phase/runtime相对since_*变化或超时后返回
+        res = fmh.phase_watcher.wait(job_id,
+                                     since_phase=request.args.get("since_phase"),
+                                     since_runtime=request.args.get("since_runtime", type=int),
+                                     timeout=min(wait, LONGPOLL_MAX_WAIT))
+    else:
+        res = fmh.get_finetune_info(job_id)
     app.logger.info(f"res: {res}")
     if not res:
         return jsonify({"status": -1, "msg": "查询微调详情失败"}), 200
-    return jsonify({"status": 200, "msg": "查询微调详情成功", "data": res})
+    return conditional_response(jsonify({"status": 200, "msg": "查询微调详情成功", "data": res}),
+                                make_etag(res["phase"], res["runtime"], res.get("stale", False)))
+
+
+@app.route("/v1/foundation-model/finetune/<string:job_id>/events", methods=["GET"])
+@auth.login_required
+def stream_finetune_events(job_id):
+    app.logger.info(f"events: {job_id}")
+
+    def generate():
+        phase, runtime = request_phase, None
+        while True:
+            info = fmh.phase_watcher.wait(job_id, since_phase=phase, since_runtime=runtime,
+                                          timeout=SSE_KEEPALIVE)
+            if info is None:
+                yield "event: error\ndata: " + json.dumps({"msg": "job_id不存在"}) + "\n\n"
+                return
+            if info["phase"] == phase and runtime in (None, info["runtime"]) and phase not in TERMINAL_PHASES:
+                # 无变化，发送注释行保持连接；已是终态时直接发送并结束，不再等待
+                yield ": keepalive\n\n"
+                continue
+            phase, runtime = info["phase"], info["runtime"]
+            yield "event: phase\ndata: " + json.dumps(info, ensure_ascii=False) + "\n\n"
+            if phase in TERMINAL_PHASES:
+                return
+
+    request_phase = request.args.get("since_phase")
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/v1/foundation-model/finetune:batchGet", methods=["POST"])
+@auth.login_required
+def batch_get_finetune():
+    if not request.json:
+        abort(400)
+    job_ids = request.json.get("job_ids")
+    if not isinstance(job_ids, list) or not all(isinstance(job_id, str) for job_id in job_ids):
+        abort(400)
+    if len(job_ids) > BATCH_MAX_SIZE:
+        return jsonify({"status": -1, "msg": f"单次最多查询{BATCH_MAX_SIZE}个微调任务"}), 200
+    app.logger.info(f"batch get: {len(job_ids)} jobs")
+    data, errors = fmh.get_finetune_info_batch(job_ids)
+    app.logger.info(f"res: {len(data)} found, {len(errors)} failed")
+    return jsonify({"status": 200, "msg": "批量查询微调详情成功", "data": data, "errors": errors})
+
+
+@app.route("/v1/foundation-model/admin/reload", methods=["POST"])
+@auth.login_required
+def reload_config():
+    if g.user.username not in ADMIN_USERS:
+        return jsonify({"status": -1, "msg": "无权限"}), 403
+    if request.environ.get("SERVER_SOFTWARE", "").startswith("gunicorn"):
+        # 配置文件缺失或无效时不重启worker
+        if load_snapshot() is None:
+            return jsonify({"status": -1, "msg": "重新加载配置失败"}), 200
+        # 由gunicorn master重新加载配置并平滑重启所有worker，进行中的请求不受影响
+        app.logger.info("reload: send SIGHUP to master")
+        os.kill(os.getppid(), signal.SIGHUP)
+        return jsonify({"status": 202, "msg": "已触发重新加载配置"}), 202
+    if not reload_snapshot():
+        return jsonify({"status": -1, "msg": "重新加载配置失败"}), 200
+    return jsonify({"status": 200, "msg": "重新加载配置成功"})
+
+
+@app.route("/v1/foundation-model/cache/stats", methods=["GET"])
+@auth.login_required
+def get_cache_stats():
+    return jsonify({"status": 200, "msg": "查询缓存统计成功", "data": {
+        "finetune_status": fmh.status_cache.stats(),
+        "log_url": fmh.log_urls.stats(),
+        "fm_pool": fmh.fm_bulkhead.stats()
+    }})
 
 
 @app.route("/v1/foundation-model/finetune/<string:job_id>", methods=["PUT"])
@@ -220,12 +690,49 @@ def delete_finetune(job_id):
         return jsonify({"status": -1, "msg": "删除微调任务失败"}), 200
     return jsonify({"status": 204, "msg": "删除微调任务成功"}), 200
 
+def parse_job_ids():
+    if not request.json:
+        abort(400)
+    job_ids = request.json.get("job_ids")
+    if not isinstance(job_ids, list) or not job_ids or not all(isinstance(job_id, str) for job_id in job_ids):
+        abort(400)
+    return job_ids
+
+
+@app.route("/v1/foundation-model/finetune:batchStop", methods=["POST"])
+@auth.login_required
+def batch_terminal_finetune():
+    job_ids = parse_job_ids()
+    if len(job_ids) > BATCH_MAX_SIZE:
+        return jsonify({"status": -1, "msg": f"单次最多终止{BATCH_MAX_SIZE}个微调任务"}), 200
+    app.logger.info(f"batch terminal: {len(job_ids)} jobs")
+    stopped, errors = fmh.terminal_finetune_batch(job_ids)
+    app.logger.info(f"res: {len(stopped)} stopped, {len(errors)} failed")
+    if not stopped:
+        return jsonify({"status": -1, "msg": "批量终止微调任务失败", "data": stopped, "errors": errors}), 200
+    return jsonify({"status": 202, "msg": "批量终止微调任务完成", "data": stopped, "errors": errors}), 200
+
+
+@app.route("/v1/foundation-model/finetune:batchDelete", methods=["POST"])
+@auth.login_required
+def batch_delete_finetune():
+    job_ids = parse_job_ids()
+    if len(job_ids) > BATCH_MAX_SIZE:
+        return jsonify({"status": -1, "msg": f"单次最多删除{BATCH_MAX_SIZE}个微调任务"}), 200
+    app.logger.info(f"batch delete: {len(job_ids)} jobs")
+    deleted, errors = fmh.delete_finetune_batch(job_ids)
+    app.logger.info(f"res: {len(deleted)} deleted, {len(errors)} failed")
+    if not deleted:
+        return jsonify({"status": -1, "msg": "批量删除微调任务失败", "data": deleted, "errors": errors}), 200
+    return jsonify({"status": 204, "msg": "批量删除微调任务完成", "data": deleted, "errors": errors}), 200
+
+
 @app.route("/v1/foundation-model/finetune/<string:job_id>/log/",
            methods=["GET"])
 @auth.login_required
 def get_log(job_id):
     app.logger.info(f"get log: {job_id}")
-    res = fmh.get_finetune_log_url(job_id=job_id)
+    res = fmh.get_finetune_log_url(job_id=job_id, refresh=request.args.get("refresh") in ("1", "true"))
     app.logger.info(f"res: {res}")
     if not res:
         return jsonify({
@@ -237,3 +744,109 @@ def get_log(job_id):
         "msg": "查询微调日志成功",
         "obs_url": res["obs_url"]
     })
+
+
+@app.route("/v1/foundation-model/finetune/<string:job_id>/log/stream",
+           methods=["GET"])
+@auth.login_required
+def stream_log(job_id):
+    app.logger.info(f"stream log: {job_id}")
+    log_path = fmh.get_finetune_log_path(job_id)
+    meta = fmh.obs_client.get_object_meta(log_path) if log_path else None
+    if meta is None:
+        return jsonify({
+            "status": -1,
+            "msg": "查询微调日志失败, 还未生成日志或者job_id不存在"
+        }), 200
+
+    # 日志未变化时不读取对象
+    etag = make_etag(meta["etag"], meta["size"])
+    if request.if_none_match.contains_weak(etag):
+        return conditional_response(Response(status=200), etag)
+
+    size = meta["size"]
+    start, stop = 0, size
+    status = 200
+    headers = {"Accept-Ranges": "bytes"}
+    tail_bytes = request.args.get("tail_bytes", type=int)
+    if tail_bytes is not None and tail_bytes >= 0:
+        start = max(0, size - tail_bytes)
+    elif request.range is not None:
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            return Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+        start, stop = byte_range
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    # 先确认OBS读取成功再发送状态码与Content-Length
+    obs_status, stream = fmh.obs_client.open_object(log_path, start, stop) if stop > start else (200, None)
+    if obs_status == 404:
+        return jsonify({"status": -1, "msg": "查询微调日志失败, 日志不存在"}), 404
+    if obs_status is None or obs_status >= 300:
+        return jsonify({"status": -1, "msg": "读取微调日志失败"}), 502
+    headers["Content-Length"] = str(stop - start)
+    # 读取中途失败时抛出异常，由服务器中断连接，客户端不会把截断的内容当作完整日志
+    body = fmh.obs_client.iter_stream(stream, stop - start, chunk_size=LOG_CHUNK_SIZE) if stream is not None else []
+    response = Response(body, status=status, mimetype="text/plain", headers=headers)
+    if stream is not None:
+        # 响应未开始迭代就被关闭时也要释放OBS连接
+        response.call_on_close(stream.close)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+@app.route("/v1/foundation-model/finetune/<string:job_id>/log/content",
+           methods=["GET"])
+@auth.login_required
+def get_log_content(job_id):
+    app.logger.info(f"get log content: {job_id}")
+    keyword = request.args.get("q")
+    cursor = request.args.get("cursor", type=int)
+    from_line = request.args.get("from_line", 0, type=int)
+    limit = min(request.args.get("limit", 100, type=int), LOG_LINES_MAX_LIMIT)
+    # 同一查询在日志对象未变化时结果不变
+    log_path = fmh.get_finetune_log_path(job_id)
+    meta = fmh.obs_client.get_object_meta(log_path) if log_path else None
+    etag = make_etag(meta["etag"], meta["size"], request.query_string.decode("utf-8")) if meta else None
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        return conditional_response(Response(status=200), etag)
+    if meta is None:
+        res = None
+    elif keyword:
+        res = fmh.search_finetune_log(job_id, keyword, from_line=from_line, limit=limit, log_path=log_path, meta=meta)
+    elif cursor is not None:
+        res = fmh.tail_finetune_log(job_id, cursor=cursor, log_path=log_path, meta=meta)
+    else:
+        res = fmh.get_finetune_log_lines(job_id, from_line=from_line, limit=limit, log_path=log_path, meta=meta)
+    if not res:
+        return jsonify({
+            "status": -1,
+            "msg": "查询微调日志失败, 还未生成日志或者job_id不存在"
+        }), 200
+    response = jsonify({"status": 200, "msg": "查询微调日志成功", "data": res})
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+@app.route("/v1/foundation-model/finetune/<string:job_id>/metrics",
+           methods=["GET"])
+@auth.login_required
+def get_finetune_metrics(job_id):
+    app.logger.info(f"get metrics: {job_id}")
+    foundation_model = request.args.get("foundation_model")
+    if foundation_model is None:
+        job = FinetuneJob.query.get(job_id)
+        foundation_model = job.foundation_model if job is not None else None
+    limit = min(request.args.get("limit", METRIC_POINTS_MAX_LIMIT, type=int), METRIC_POINTS_MAX_LIMIT)
+    try:
+        res = fmh.get_finetune_metrics(job_id, foundation_model=foundation_model,
+                                       since_step=request.args.get("since_step", type=int), limit=limit)
+    except ValueError as e:
+        return jsonify({"status": -1, "msg": str(e)}), 200
+    if not res:
+        return jsonify({
+            "status": -1,
+            "msg": "查询训练指标失败, 还未生成日志或者job_id不存在"
+        }), 200
+    return jsonify({"status": 200, "msg": "查询训练指标成功", "data": res})
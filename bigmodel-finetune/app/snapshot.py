@@ -0,0 +1,88 @@
+import os
+import re
+from types import MappingProxyType
+from collections import namedtuple
+
+# 单个(大模型, 任务类型)预先解析好的配置
+TaskSpec = namedtuple("TaskSpec", [
+    "foundation_model", "task_type", "model_save_path", "app_config",
+    "model_config_name", "default_model_config", "supported_params"
+])
+# 从日志行中提取训练指标的正则，step与metrics中的每个正则取第一个分组
+MetricPatterns = namedtuple("MetricPatterns", ["step", "metrics"])
+
+
+def _compile_metric_patterns(patterns):
+    if not patterns or "step" not in patterns:
+        return None
+    return MetricPatterns(
+        step=re.compile(patterns["step"]),
+        metrics=tuple((name, re.compile(pattern)) for name, pattern in patterns.items() if name != "step"))
+
+
+class FinetuneSnapshot:
+    """
+    finetune_basic.yml的只读快照，启动或重新加载时一次性解析，请求中直接查表
+    """
+
+    def __init__(self, config):
+        """
+        :param config: finetune_basic.yml解析后的dict
+        """
+        models = config["foundation_model"]
+        self.config = MappingProxyType(config)
+        self.scenario = config["scenario"]
+        self.bucket = config["finetune_bucket"]
+        self.engine = models["engine"]
+        self.supported = tuple(models["supported"])
+
+        # 默认scenario、foundation_model、app_config用于获取session
+        default_model = models[self.supported[0]]
+        self.app_config_default = os.path.join(
+            default_model["model_save_path"], default_model["inference"]["app_config_name"])
+
+        tasks = {}
+        for foundation_model, model in models.items():
+            if not isinstance(model, dict) or "model_save_path" not in model:
+                continue
+            for task_type, task in model.items():
+                if not isinstance(task, dict) or "supported_params" not in task:
+                    continue
+                tasks[(foundation_model, task_type)] = TaskSpec(
+                    foundation_model=foundation_model,
+                    task_type=task_type,
+                    model_save_path=model["model_save_path"],
+                    app_config=os.path.join(model["model_save_path"], task["app_config_name"]),
+                    model_config_name=task["model_config_name"],
+                    default_model_config=os.path.join(model["model_save_path"], task["model_config_name"]),
+                    supported_params=frozenset(task["supported_params"]))
+        self.tasks = MappingProxyType(tasks)
+
+        # foundation_model下的metric_patterns为默认值，各大模型可单独配置
+        default_patterns = _compile_metric_patterns(models.get("metric_patterns"))
+        metric_patterns = {}
+        for foundation_model in self.supported:
+            model = models.get(foundation_model) or {}
+            metric_patterns[foundation_model] = \
+                _compile_metric_patterns(model.get("metric_patterns")) or default_patterns
+        self._default_metric_patterns = default_patterns
+        self._metric_patterns = MappingProxyType(metric_patterns)
+
+    def task(self, foundation_model, task_type):
+        """
+        :return: TaskSpec|None
+        """
+        return self.tasks.get((foundation_model, task_type))
+
+    def metric_patterns(self, foundation_model=None):
+        """
+        :param foundation_model: 大模型名称，None表示使用默认配置
+        :return: MetricPatterns|None
+        """
+        return self._metric_patterns.get(foundation_model, self._default_metric_patterns)
+
+    def obs_key(self, obs_url):
+        """
+        将finetune_bucket下的obs url转为对象key
+        """
+        return obs_url.replace("obs://" + self.bucket + "/", "")
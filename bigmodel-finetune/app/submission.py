@@ -0,0 +1,78 @@
+import queue
+import logging
+import threading
+
+from .pool import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+TICKET_PENDING = "pending"
+TICKET_RUNNING = "running"
+TICKET_SUCCEEDED = "succeeded"
+TICKET_FAILED = "failed"
+
+
+class SubmissionQueue:
+    """
+    异步提交微调任务：请求只入队并返回ticket，后台worker池以限定的并发和速率调用fm
+    """
+
+    def __init__(self, submit, on_update, concurrency=2, rate=None, maxsize=100):
+        """
+        :param submit: 提交函数，参数为入队时的kwargs，返回-1或者job_id
+        :param on_update: 状态回调on_update(ticket_id, status, job_id=None, msg=None)
+        :param concurrency: 后台worker数
+        :param rate: 每秒最多提交数，None表示不限流
+        :param maxsize: 队列最大长度，超过后拒绝入队
+        """
+        self._submit = submit
+        self._on_update = on_update
+        self.concurrency = concurrency
+        self._limiter = RateLimiter(rate)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def enqueue(self, ticket_id, **kwargs):
+        """
+        :return: bool, 队列已满时为False
+        """
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((ticket_id, kwargs))
+        except queue.Full:
+            return False
+        return True
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def _ensure_workers(self):
+        # 在首次使用时启动，保证线程在fork之后创建
+        if len(self._workers) >= self.concurrency:
+            return
+        with self._lock:
+            while len(self._workers) < self.concurrency:
+                worker = threading.Thread(target=self._run, name=f"submission-{len(self._workers)}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _run(self):
+        while True:
+            ticket_id, kwargs = self._queue.get()
+            try:
+                self._limiter.acquire()
+                self._on_update(ticket_id, TICKET_RUNNING)
+                res = self._submit(**kwargs)
+                if res == -1:
+                    self._on_update(ticket_id, TICKET_FAILED, msg="创建微调任务失败")
+                else:
+                    self._on_update(ticket_id, TICKET_SUCCEEDED, job_id=res)
+            except Exception as e:
+                logger.exception("submit finetune failed: %s", ticket_id)
+                try:
+                    self._on_update(ticket_id, TICKET_FAILED, msg=str(e))
+                except Exception:
+                    logger.exception("update ticket failed: %s", ticket_id)
+            finally:
+                self._queue.task_done()
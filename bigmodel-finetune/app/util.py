@@ -1,18 +1,23 @@
 import yaml
+import json
 import uuid
+import hashlib
 import pytz
 import datetime
 import os
+from urllib.parse import parse_qsl, urlsplit
 
-def read_full_yaml(path):
+def read_full_yaml(path, remove=True):
     """
     以FullLoader模型读取yaml文件
     :param path: config path
+    :param remove: 读取后是否删除文件
     :return: dict
     """
     with open(path, 'r', encoding='utf-8') as f:
         basic_config = yaml.safe_load(f.read())
-    os.remove(path)
+    if remove:
+        os.remove(path)
     return basic_config
 
 def convert_dict_to_yaml(dict_value):
@@ -23,6 +28,15 @@ def convert_dict_to_yaml(dict_value):
     """
     return yaml.dump(dict_value, allow_unicode=True)
 
+def hash_dict(dict_value):
+    """
+    计算规范化(key排序)后的dict的sha256，用于内容寻址
+    :param dict_value:
+    :return: string
+    """
+    canonical = json.dumps(dict_value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
 def convert_mstimestamp(mstimestamp):
     """
     将ms级时间戳转为上海时区的时间(时间格式：%Y-%m-%d %H:%M:%S)
@@ -45,6 +59,36 @@ def convert_msruntime(msduration):
     return str(time)
 
 
+def parse_utc_isotime(value):
+    """
+    将IAM返回的UTC时间(如2023-01-01T00:00:00.000000Z)转为unix时间戳
+    :param value:
+    :return: float
+    """
+    value = value.rstrip("Z")
+    fmt = "%Y-%m-%dT%H:%M:%S.%f" if "." in value else "%Y-%m-%dT%H:%M:%S"
+    dt = datetime.datetime.strptime(value, fmt).replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def presigned_url_expire_at(url):
+    """
+    解析预签名url中的过期时间，支持Expires(unix时间戳)与X-Amz-Date/X-Amz-Expires两种格式
+    :param url:
+    :return: float|None, unix时间戳，无法解析时为None
+    """
+    query = {key.lower(): value for key, value in parse_qsl(urlsplit(url).query)}
+    try:
+        if "expires" in query:
+            return float(query["expires"])
+        if "x-amz-date" in query and "x-amz-expires" in query:
+            dt = datetime.datetime.strptime(query["x-amz-date"], "%Y%m%dT%H%M%SZ")
+            return dt.replace(tzinfo=datetime.timezone.utc).timestamp() + float(query["x-amz-expires"])
+    except ValueError:
+        pass
+    return None
+
+
 def gen_uuid(num=6):
     """
     将ms级别时间戳差转为时间格式(%H:%M:%S)
@@ -0,0 +1,92 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _changed(info, since_phase, since_runtime):
+    if info is None:
+        return True
+    if since_phase is not None and info["phase"] != since_phase:
+        return True
+    if since_runtime is not None and info["runtime"] != since_runtime:
+        return True
+    return False
+
+
+class PhaseWatcher:
+    """
+    每个worker一个后台轮询线程，仅在phase或runtime变化时唤醒等待者，
+    用于长轮询和SSE，代替客户端的定时轮询
+    """
+
+    def __init__(self, fetch, interval=3):
+        """
+        :param fetch: 根据job_id获取微调信息的函数，job不存在时返回None
+        :param interval: 后台轮询间隔(秒)
+        """
+        self._fetch = fetch
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._states = {}  # job_id -> 最近一次的微调信息
+        self._waiters = {}  # job_id -> 等待者数量
+        self._thread = None
+
+    def wait(self, job_id, since_phase=None, since_runtime=None, timeout=30):
+        """
+        阻塞直到微调信息相对since_phase/since_runtime发生变化或超时
+        :return: 最新的微调信息，job不存在时为None
+        """
+        info = self._fetch(job_id)
+        if since_phase is None and since_runtime is None:
+            return info
+        if _changed(info, since_phase, since_runtime):
+            return info
+
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._states.setdefault(job_id, info)
+            self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+            self._ensure_poller()
+            try:
+                while True:
+                    info = self._states.get(job_id)
+                    remaining = deadline - time.monotonic()
+                    if _changed(info, since_phase, since_runtime) or remaining <= 0:
+                        return info
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters[job_id] -= 1
+                if self._waiters[job_id] == 0:
+                    del self._waiters[job_id]
+                    self._states.pop(job_id, None)
+
+    def _ensure_poller(self):
+        # 在首次使用时启动，保证线程在fork之后创建
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._poll_loop, name="phase-watcher", daemon=True)
+            self._thread.start()
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._cond:
+                job_ids = list(self._waiters)
+                if not job_ids:
+                    self._thread = None
+                    return
+            for job_id in job_ids:
+                try:
+                    info = self._fetch(job_id)
+                except Exception:
+                    logger.exception("phase watcher fetch failed: %s", job_id)
+                    continue
+                with self._cond:
+                    if job_id not in self._waiters:
+                        continue
+                    old = self._states.get(job_id)
+                    if old is None or info is None or \
+                            (old["phase"], old["runtime"]) != (info["phase"], info["runtime"]):
+                        self._states[job_id] = info
+                        self._cond.notify_all()
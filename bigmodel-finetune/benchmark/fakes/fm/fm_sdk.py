@@ -0,0 +1,58 @@
+"""
+压测用的fm.fm_sdk替身，接口与Ascend mxFoundationModel保持一致，通过环境变量模拟后端耗时：
+FAKE_FM_LATENCY: 每次调用的耗时(秒)
+FAKE_OBS_ROOT: 与obs替身共享的本地目录，创建任务时在其中生成日志
+"""
+import os
+import time
+import uuid
+
+LATENCY = float(os.environ.get("FAKE_FM_LATENCY", "0.05"))
+OBS_ROOT = os.environ.get("FAKE_OBS_ROOT", "/tmp/fake-obs")
+BUCKET = os.environ.get("FAKE_FINETUNE_BUCKET", "finetune")
+LOG_DIR = "logs"
+LOG_LINES = int(os.environ.get("FAKE_LOG_LINES", "2000"))
+
+
+def _sleep():
+    if LATENCY > 0:
+        time.sleep(LATENCY)
+
+
+def registry(registry_info):
+    _sleep()
+    return True
+
+
+def finetune(scenario, app_config, job_name, model_config_path):
+    _sleep()
+    job_id = str(uuid.uuid4())
+    log_dir = os.path.join(OBS_ROOT, BUCKET, LOG_DIR)
+    os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, f"modelarts-job-{job_id}-worker-0.log"), "w") as f:
+        for step in range(LOG_LINES):
+            f.write(f"epoch: 1 step: {step}, loss is {1.0 / (step + 1):.6f}\n")
+    return job_id
+
+
+def show(scenario, app_config, job_id):
+    _sleep()
+    # 任意job_id都视为运行中的任务，便于多个worker之间共享
+    now = int(time.time() * 1000)
+    return {
+        "metadata": {"create_time": now - 60000, "name": f"bench-{job_id[:6]}"},
+        "algorithm": {"parameters": [{"name": "backend", "value": "mindspore"},
+                                     {"name": "task_type", "value": "finetune"}]},
+        "status": {"phase": "Running", "duration": 60000},
+        "spec": {"log_export_path": {"obs_url": f"/{BUCKET}/{LOG_DIR}/"}}
+    }
+
+
+def stop(scenario, app_config, job_id):
+    _sleep()
+    return True
+
+
+def delete(scenario, app_config, job_id):
+    _sleep()
+    return True
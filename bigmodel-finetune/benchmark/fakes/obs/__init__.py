@@ -0,0 +1,136 @@
+"""
+压测用的esdk-obs-python替身，以本地目录FAKE_OBS_ROOT/<bucket>/<key>保存对象，
+多个gunicorn worker之间共享；FAKE_OBS_LATENCY模拟每次请求的耗时(秒)
+"""
+import os
+import time
+import hashlib
+
+LATENCY = float(os.environ.get("FAKE_OBS_LATENCY", "0.01"))
+OBS_ROOT = os.environ.get("FAKE_OBS_ROOT", "/tmp/fake-obs")
+
+
+class _Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class GetObjectHeader:
+    def __init__(self, range=None, **kwargs):
+        self.range = range
+
+
+class Object:
+    def __init__(self, key=None, versionId=None):
+        self.key = key
+        self.versionId = versionId
+
+
+class DeleteObjectsRequest:
+    def __init__(self, quiet=None, objects=None, encoding_type=None):
+        self.quiet = quiet
+        self.objects = objects or []
+
+
+class _Stream:
+    def __init__(self, f, length):
+        self._f = f
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        data = self._f.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._f.close()
+
+
+def _ok(body=None):
+    return _Obj(status=200, body=body, errorCode=None, errorMessage=None)
+
+
+def _not_found():
+    return _Obj(status=404, body=None, errorCode="NoSuchKey", errorMessage="The specified key does not exist.")
+
+
+class ObsClient:
+    def __init__(self, access_key_id=None, secret_access_key=None, server=None, **kwargs):
+        self.server = server
+
+    def _path(self, bucket, key):
+        return os.path.join(OBS_ROOT, bucket, key)
+
+    def _sleep(self):
+        if LATENCY > 0:
+            time.sleep(LATENCY)
+
+    def close(self):
+        pass
+
+    def listObjects(self, bucketName, prefix="", marker="", max_keys=1000, delimiter=None, **kwargs):
+        self._sleep()
+        root = os.path.join(OBS_ROOT, bucketName)
+        keys = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                key = os.path.relpath(os.path.join(dirpath, filename), root)
+                if key.startswith(prefix or "") and key > (marker or ""):
+                    if delimiter and delimiter in key[len(prefix or ""):]:
+                        continue
+                    keys.append(key)
+        keys.sort()
+        page = keys[:max_keys]
+        truncated = len(keys) > max_keys
+        return _ok(_Obj(contents=[_Obj(key=key) for key in page], is_truncated=truncated,
+                        next_marker=page[-1] if truncated else None))
+
+    def getObjectMetadata(self, bucketName, objectKey, **kwargs):
+        self._sleep()
+        path = self._path(bucketName, objectKey)
+        if not os.path.isfile(path):
+            return _not_found()
+        stat = os.stat(path)
+        etag = hashlib.md5(f"{stat.st_size}-{stat.st_mtime_ns}".encode()).hexdigest()
+        return _ok(_Obj(contentLength=stat.st_size, etag=f'"{etag}"', lastModified=stat.st_mtime))
+
+    def getObject(self, bucketName, objectKey, headers=None, loadStreamInMemory=False, **kwargs):
+        self._sleep()
+        path = self._path(bucketName, objectKey)
+        if not os.path.isfile(path):
+            return _not_found()
+        size = os.path.getsize(path)
+        start, stop = 0, size
+        if headers is not None and headers.range:
+            first, _, last = headers.range.replace("bytes=", "").partition("-")
+            start = int(first)
+            stop = min(size, int(last) + 1) if last else size
+        f = open(path, "rb")
+        f.seek(start)
+        if loadStreamInMemory:
+            with f:
+                return _ok(_Obj(buffer=f.read(max(0, stop - start))))
+        return _ok(_Obj(response=_Stream(f, max(0, stop - start))))
+
+    def putContent(self, bucketName, objectKey, content=None, **kwargs):
+        self._sleep()
+        path = self._path(bucketName, objectKey)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content.encode("utf-8") if isinstance(content, str) else content)
+        return _ok()
+
+    def deleteObjects(self, bucketName, deleteObjectsRequest, **kwargs):
+        self._sleep()
+        deleted = []
+        for obj in deleteObjectsRequest.objects[:1000]:
+            try:
+                os.remove(self._path(bucketName, obj.key))
+            except FileNotFoundError:
+                pass
+            deleted.append(_Obj(key=obj.key))
+        # 与OBS一致：quiet模式不返回删除成功的对象，删除不存在的对象也视为成功
+        return _ok(_Obj(deleted=[] if deleteObjectsRequest.quiet else deleted, error=[]))
@@ -0,0 +1,225 @@
+"""
+离线压测：用本地替身代替fm、OBS、IAM与MySQL，按Go客户端的调用方式回放流量，
+对不同的gunicorn worker数输出各阶段的p50/p99延迟与rps。
+
+在bigmodel-finetune目录下执行：
+    python -m benchmark.run --cpu-counts 1,2 --clients 20 --jobs-per-client 2 --polls 50
+worker数与gunicorn.config.py一致，为 2 * CPU_COUNT + 1。
+"""
+import os
+import sys
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+import requests
+
+from .stubs import start_stub_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+FAKES = os.path.join(ROOT, "benchmark", "fakes")
+BUCKET = "finetune"
+USERNAME = "bench"
+PASSWORD = "bench-password"
+
+
+def write_conf(workdir, stub_url):
+    # 写入临时目录并通过FINETUNE_CONF_DIR指定，不覆盖源码目录下的conf
+    # asset.yml读取后会被删除，每次启动前重新生成
+    asset = {
+        "REGISTRY_TYPE": 1, "AK": "ak", "SK": "sk", "OBS_ENDPOINT": "obs.local", "ENCRYPTION_OPTION": "0",
+        "AICC_USER_NAME": "user", "AICC_DOMAIN_NAME": "domain", "AICC_PASSWD": "passwd",
+        "IAM_ENDPOINT": f"{stub_url}/v3/auth/tokens", "ENDPOINT": "cn-central-221",
+        "FINETUNE_LOG_ENDPOINT": f"{stub_url}/v2/project/", "BUCKET_NAME": BUCKET,
+        "SECRET_KEY": "bench-secret", "FINETUNE_TABLE": "finetune_user",
+        "FINETUNE_MYSQL_URI": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "LOG_KEY_INDEX_FILE": os.path.join(workdir, "log_keys.json"),
+    }
+    finetune = {
+        "scenario": "bench",
+        "finetune_bucket": BUCKET,
+        "foundation_model": {
+            "supported": ["opt-caption"],
+            "engine": "mindspore",
+            "metric_patterns": {"step": r"step: (\d+)", "loss": r"loss is ([0-9.eE+-]+)"},
+            "opt-caption": {
+                "model_save_path": f"obs://{BUCKET}/opt-caption",
+                "inference": {"app_config_name": "app_config_inference.yaml"},
+                "finetune": {
+                    "app_config_name": "app_config_finetune.yaml",
+                    "model_config_name": "model_config_finetune.yaml",
+                    "supported_params": ["epochs", "start_learning_rate", "end_learning_rate"]
+                }
+            }
+        }
+    }
+    conf_dir = os.path.join(workdir, "conf")
+    os.makedirs(conf_dir, exist_ok=True)
+    with open(os.path.join(conf_dir, "asset.yml"), "w") as f:
+        yaml.safe_dump(asset, f)
+    with open(os.path.join(conf_dir, "finetune_basic.yml"), "w") as f:
+        yaml.safe_dump(finetune, f)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(cpu_count, port, workdir, args):
+    env = dict(os.environ,
+               CPU_COUNT=str(cpu_count),
+               FINETUNE_CONF_DIR=os.path.join(workdir, "conf"),
+               PYTHONPATH=os.pathsep.join([FAKES, os.environ.get("PYTHONPATH", "")]),
+               FAKE_OBS_ROOT=os.path.join(workdir, "obs"),
+               FAKE_FINETUNE_BUCKET=BUCKET,
+               FAKE_FM_LATENCY=str(args.fm_latency),
+               FAKE_OBS_LATENCY=str(args.obs_latency))
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.config.py",
+                             "-b", f"127.0.0.1:{port}", "app.run:app"],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+        try:
+            if requests.get(base + "/health", timeout=1).ok:
+                return proc, base
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("gunicorn did not become ready")
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+
+    def call(self, phase, func, *args, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        res = None
+        try:
+            res = func(*args, **kwargs)
+            ok = res.status_code < 400
+        except requests.RequestException:
+            pass
+        self.samples.setdefault(phase, []).append((start, time.perf_counter(), ok))
+        return res
+
+    def report(self):
+        rows = []
+        for phase, samples in self.samples.items():
+            latencies = sorted(end - start for start, end, _ in samples)
+            wall = max(end for _, end, _ in samples) - min(start for start, _, _ in samples)
+            errors = sum(1 for _, _, ok in samples if not ok)
+            rows.append((phase, len(samples), errors, len(samples) / wall if wall > 0 else 0,
+                         percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000))
+        return rows
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def client_session(base, recorder, args):
+    # 与Go客户端一致：获取token、创建任务、轮询状态、获取日志
+    session = requests.Session()
+    res = recorder.call("token", session.post, base + "/foundation-model/token",
+                        json={"username": USERNAME, "password": PASSWORD})
+    token = res.json().get("token") if res is not None and res.ok else None
+    headers = {"Authorization": f"JWT {token}"}
+    return session, headers
+
+
+def run_load(base, args):
+    requests.post(base + "/foundation-model/users", json={"username": USERNAME, "password": PASSWORD})
+    recorder = Recorder()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        sessions = list(executor.map(lambda _: client_session(base, recorder, args), range(args.clients)))
+
+        def create(client):
+            session, headers = client
+            job_ids = []
+            for i in range(args.jobs_per_client):
+                res = recorder.call("create", session.post, base + "/v1/foundation-model/finetune", headers=headers,
+                                    json={"user": USERNAME, "task_name": f"bench-{i}", "foundation_model": "opt-caption",
+                                          "task_type": "finetune",
+                                          "parameters": [{"name": "epochs", "value": str(i % 3 + 1)}]})
+                if res is not None and res.ok and res.json().get("job_id"):
+                    job_ids.append(res.json()["job_id"])
+            return job_ids
+
+        jobs = list(executor.map(create, sessions))
+
+        def poll(index):
+            session, headers = sessions[index]
+            for _ in range(args.polls):
+                for job_id in jobs[index]:
+                    recorder.call("status", session.get, f"{base}/v1/foundation-model/finetune/{job_id}",
+                                  headers=headers)
+
+        list(executor.map(poll, range(args.clients)))
+
+        def fetch_logs(index):
+            session, headers = sessions[index]
+            for job_id in jobs[index]:
+                recorder.call("log", session.get, f"{base}/v1/foundation-model/finetune/{job_id}/log/stream",
+                              headers=headers)
+
+        list(executor.map(fetch_logs, range(args.clients)))
+
+        def fetch_metrics(index):
+            session, headers = sessions[index]
+            for job_id in jobs[index]:
+                recorder.call("metrics", session.get, f"{base}/v1/foundation-model/finetune/{job_id}/metrics",
+                              headers=headers)
+
+        list(executor.map(fetch_metrics, range(args.clients)))
+    return recorder.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline benchmark for bigmodel-finetune")
+    parser.add_argument("--cpu-counts", default="1,2", help="逗号分隔的CPU_COUNT，worker数为2*CPU_COUNT+1")
+    parser.add_argument("--clients", type=int, default=20, help="并发客户端数")
+    parser.add_argument("--jobs-per-client", type=int, default=2)
+    parser.add_argument("--polls", type=int, default=50, help="每个客户端对每个任务的状态查询次数")
+    parser.add_argument("--fm-latency", type=float, default=0.05)
+    parser.add_argument("--obs-latency", type=float, default=0.01)
+    parser.add_argument("--iam-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    stub_server, stub_url = start_stub_server(latency=args.iam_latency)
+    try:
+        for cpu_count in [int(value) for value in args.cpu_counts.split(",")]:
+            workdir = tempfile.mkdtemp(prefix="finetune-bench-")
+            write_conf(workdir, stub_url)
+            proc, base = start_gunicorn(cpu_count, free_port(), workdir, args)
+            try:
+                rows = run_load(base, args)
+            finally:
+                proc.terminate()
+                proc.wait()
+                shutil.rmtree(workdir, ignore_errors=True)
+            print(f"\nworkers={2 * cpu_count + 1} clients={args.clients}")
+            print(f"{'phase':<8}{'count':>8}{'errors':>8}{'rps':>10}{'p50(ms)':>10}{'p99(ms)':>10}")
+            for phase, count, errors, rps, p50, p99 in rows:
+                print(f"{phase:<8}{count:>8}{errors:>8}{rps:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+    finally:
+        stub_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
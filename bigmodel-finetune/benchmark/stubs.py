@@ -0,0 +1,50 @@
+"""
+IAM与ModelArts日志接口的本地替身
+"""
+import json
+import time
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    latency = 0.02
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        # IAM密码认证
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(hours=24)
+        self._reply(201, {"token": {"expires_at": expires_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")}},
+                    headers={"X-Subject-Token": "bench-token"})
+
+    def do_GET(self):
+        # ModelArts training-jobs/{job_id}/tasks/worker-0/logs/url
+        time.sleep(self.latency)
+        expires = int(time.time()) + 3600
+        self._reply(200, {"obs_url": f"https://obs.local{self.path}?Expires={expires}&Signature=bench"})
+
+
+def start_stub_server(port=0, latency=0.02):
+    """
+    在后台线程中启动替身服务
+    :return: (server, base_url)
+    """
+    handler = type("StubHandler", (_Handler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -1,10 +1,13 @@
 import os
+import sys
 import time
 import gevent.monkey
 gevent.monkey.patch_all()
 
 import multiprocessing
 
+boot_time = time.time()
+
 CPU_COUNT = os.environ.get("CPU_COUNT", 4)
 
 gmt_time = time.gmtime()
@@ -21,9 +24,18 @@ for file_name in os.listdir(log_path):
     if os.path.exists(file_path):
         os.remove(file_path)
 
-from app.fmh import FoundationModelHandler
-fmh = FoundationModelHandler()
-fmh.registry()
+# 供应用写入profile等诊断文件
+os.environ["FINETUNE_LOG_DIR"] = log_path
+
+# 多进程指标目录，需要在导入prometheus_client之前设置
+prometheus_dir = os.path.join(log_path, "prometheus")
+if not os.path.exists(prometheus_dir):
+    os.makedirs(prometheus_dir)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", prometheus_dir)
+
+# 在master中完成fm注册与配置解析，worker fork后直接继承
+from app.fmh import registry_once
+registry_once()
 
 debug = True
 loglevel = 'debug'
@@ -34,12 +46,36 @@ backlog = 512                        #监听队列
 accesslog = os.path.join(log_path, "access.log")
 errorlog = os.path.join(log_path, "debug.log")
 daemon = False
+# 预加载应用，worker共享master中已解析的配置，客户端在fork后懒加载
+preload_app = os.environ.get("PRELOAD_APP", "true").lower() == "true"
 
 # 启动的进程数
 timeout = 60                         #超时
 worker_class = "gevent"
 x_forwarded_for_header = "X-FORWARDED-FOR"
 
+
+def when_ready(server):
+    server.log.info("master ready in %.3fs", time.time() - boot_time)
+
+
+def post_fork(server, worker):
+    run = sys.modules.get("app.run")
+    if run is not None:
+        run.mark_worker_started()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_reload(arbiter):
+    # SIGHUP: master重新读取conf/finetune_basic.yml，之后gunicorn平滑替换的worker会继承新的配置快照
+    from app.fmh import reload_snapshot
+    reload_snapshot()
+
+
 print(multiprocessing.cpu_count())
 workers = int(CPU_COUNT) * 2 + 1    # 进程数
 threads = 4     # 指定每个进程开启的线程数
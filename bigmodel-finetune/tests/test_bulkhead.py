@@ -0,0 +1,62 @@
+import time
+import threading
+
+import pytest
+
+from app.bulkhead import Bulkhead, BulkheadFullError, CircuitBreaker, CircuitOpenError, FMTimeoutError
+
+
+def test_half_open_trial_not_lost_when_pool_full():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    bulkhead = Bulkhead(max_workers=1, max_queue=0, default_timeout=0.05, breaker=breaker)
+    hang = threading.Event()
+    try:
+        # 超时的调用打开熔断器并继续占用唯一的线程
+        with pytest.raises(FMTimeoutError):
+            bulkhead.call("show", hang.wait)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        # 试探调用因池满被拒，不能占住半开状态的试探名额
+        with pytest.raises(BulkheadFullError):
+            bulkhead.call("show", lambda: "ok")
+        assert not breaker._trial
+    finally:
+        hang.set()
+    while bulkhead.stats()["busy"]:
+        time.sleep(0.01)
+
+    assert bulkhead.call("show", lambda: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_trial_returned_when_submit_fails():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    bulkhead = Bulkhead(max_workers=1, max_queue=0, breaker=breaker)
+    with pytest.raises(ValueError):
+        bulkhead.call("show", _raise)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    bulkhead.executor.shutdown(wait=True)
+    with pytest.raises(RuntimeError):
+        bulkhead.call("show", lambda: "ok")
+    assert bulkhead.stats()["busy"] == 0
+    assert breaker.allow()
+
+
+def test_open_circuit_does_not_hold_pool_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    bulkhead = Bulkhead(max_workers=1, max_queue=0, breaker=breaker)
+    with pytest.raises(ValueError):
+        bulkhead.call("show", _raise)
+    with pytest.raises(CircuitOpenError):
+        bulkhead.call("show", lambda: "ok")
+    assert bulkhead.stats()["busy"] == 0
+
+
+def _raise():
+    raise ValueError("boom")
+
+
+def test_operation_without_timeout_waits_for_result():
+    bulkhead = Bulkhead(max_workers=1, max_queue=0, timeouts={"registry": None}, default_timeout=0.01)
+    assert bulkhead.call("registry", lambda: time.sleep(0.05) or True) is True
@@ -0,0 +1,71 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def fmh(tmp_path_factory):
+    # 使用benchmark中的fm、OBS替身，配置写入临时目录
+    from benchmark.run import write_conf
+    workdir = str(tmp_path_factory.mktemp("fmh"))
+    write_conf(workdir, "http://127.0.0.1:1")
+    env = {"FINETUNE_CONF_DIR": os.path.join(workdir, "conf"), "FAKE_OBS_ROOT": os.path.join(workdir, "obs"),
+           "FAKE_FM_LATENCY": "0", "FAKE_OBS_LATENCY": "0", "FAKE_LOG_LINES": "50"}
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    sys.path.insert(0, os.path.join(ROOT, "benchmark", "fakes"))
+    try:
+        module = importlib.import_module("app.fmh")
+        yield module.FoundationModelHandler()
+    finally:
+        sys.path.remove(os.path.join(ROOT, "benchmark", "fakes"))
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def create_job(fmh):
+    import fm.fm_sdk as fm
+    return fm.finetune(scenario=None, app_config=None, job_name="test", model_config_path=None)
+
+
+def test_log_lines_clamps_negative_from_line(fmh):
+    job_id = create_job(fmh)
+    res = fmh.get_finetune_log_lines(job_id, from_line=-5, limit=2)
+    assert res["from_line"] == 0
+    assert res["next_line"] == 2
+    assert res["lines"] == ["epoch: 1 step: 0, loss is 1.000000", "epoch: 1 step: 1, loss is 0.500000"]
+
+
+def test_log_lines_clamps_non_positive_limit(fmh):
+    job_id = create_job(fmh)
+    res = fmh.get_finetune_log_lines(job_id, from_line=3, limit=-1)
+    assert res["from_line"] == 3
+    assert res["next_line"] == 4
+    assert len(res["lines"]) == 1
+
+
+def test_search_stops_at_scan_budget(fmh, monkeypatch):
+    job_id = create_job(fmh)
+    line_size = len("epoch: 1 step: 0, loss is 1.000000\n")
+    monkeypatch.setattr(fmh, "log_read_max_bytes", line_size * 10)
+    monkeypatch.setattr(fmh, "log_search_max_bytes", line_size * 20)
+    res = fmh.search_finetune_log(job_id, "not in log", limit=10)
+    assert res["matches"] == []
+    assert 0 < res["next_line"] < res["total_lines"]
+
+    # 客户端从next_line继续查找，直至扫描完整个日志
+    lines, from_line, calls = [], 0, 0
+    while from_line < res["total_lines"]:
+        res = fmh.search_finetune_log(job_id, "step: 49,", from_line=from_line, limit=10)
+        lines.extend(match["line"] for match in res["matches"])
+        from_line = res["next_line"]
+        calls += 1
+    assert lines == [49]
+    assert calls > 1